@@ -39,15 +39,21 @@ except (ImportError, RuntimeError):
     messagebox = None
     filedialog = None
 
+import gzip
 import hashlib
+import hmac
+import html
 import json
 import os
+import queue
 import threading
 import time
-import tempfile
 import webbrowser
 import socket
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
 from difflib import SequenceMatcher
 import re
 import base64
@@ -63,8 +69,27 @@ if TKINTER_AVAILABLE:
 else:
     ImageTk = None
 
-# OpenCV's built-in QR code detector (no system dependencies needed)
-qr_detector = cv2.QRCodeDetector()
+# CLAHE objects keep scratch buffers between apply() calls, so they are
+# built once per thread and reused rather than shared or rebuilt per call
+_cv_local = threading.local()
+
+def _get_clahe(clip_limit: float, tile: int):
+    cache = getattr(_cv_local, "clahe", None)
+    if cache is None:
+        cache = _cv_local.clahe = {}
+    clahe = cache.get((clip_limit, tile))
+    if clahe is None:
+        clahe = cache[(clip_limit, tile)] = cv2.createCLAHE(
+            clipLimit=clip_limit, tileGridSize=(tile, tile))
+    return clahe
+
+def _get_qr_detector():
+    """OpenCV's built-in QR code detector (no system dependencies needed).
+    One per thread: decodes run concurrently and an instance is not safe to share."""
+    detector = getattr(_cv_local, "qr", None)
+    if detector is None:
+        detector = _cv_local.qr = cv2.QRCodeDetector()
+    return detector
 
 def decode(image, symbols=None):
     """
@@ -86,6 +111,8 @@ def decode(image, symbols=None):
             self.points = qr_points
             self.polygon = polygon if polygon is not None else []
     
+    qr_detector = _get_qr_detector()
+
     # Strategy 1: Direct detection on grayscale
     data, points, _ = qr_detector.detectAndDecode(gray)
     if data:
@@ -93,8 +120,7 @@ def decode(image, symbols=None):
         return [QRCode(data, points, polygon)]
     
     # Strategy 2: CLAHE enhancement (Contrast Limited Adaptive Histogram Equalization)
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    enhanced = clahe.apply(gray)
+    enhanced = _get_clahe(2.0, 8).apply(gray)
     data, points, _ = qr_detector.detectAndDecode(enhanced)
     if data:
         polygon = [tuple(pt) for pt in points] if points is not None else []
@@ -158,6 +184,7 @@ class ZBarSymbol:
 
 # Flask
 from flask import Flask, request, jsonify, send_file, Response
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
 # Optional imports
@@ -168,13 +195,33 @@ except ImportError:
     PYMUPDF_AVAILABLE = False
 
 try:
-    from scipy.fftpack import dct
+    from scipy.fft import dctn
     SCIPY_AVAILABLE = True
 except ImportError:
     SCIPY_AVAILABLE = False
-    def dct(x, norm=None):
+    def dctn(x, type=2, norm=None, workers=None):
         return x
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+    json_loads = orjson.loads
+except ImportError:
+    ORJSON_AVAILABLE = False
+    json_loads = json.loads
+
+try:
+    from waitress import serve as waitress_serve
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -183,13 +230,25 @@ DB_FILE = "issued_documents.json"   # kept as local fallback only
 QR_FRACTION = 0.18
 VISUAL_SIZE = 256
 PERCEPTUAL_SIZE = 32
+PHASH_PREFIX = "p2:"        # marks DCT pHashes; unprefixed stored hashes are legacy 8x8 average hashes
+QR_DECODE_MAX_EDGE = 2000   # photos are shrunk to this long edge before QR decoding
+PHASH_MATCH_MAX_BITS = 5    # max Hamming distance for a QR-less registry pHash match
+PHASH_REJECT_SCORE = 0.5    # below this, 0.7*phash + 0.3*text < 0.65 even with perfect text
+PHASH_ACCEPT_SCORE = 0.93   # at or above this, 0.7*phash + 0.3*text >= 0.65 even with no text match
 QUALITY_BLUR_THRESHOLD = 80
+FEED_TICK_MS = 25           # desktop camera preview: grab() period
+FEED_DECODE_EVERY = 2       # ...and only every Nth grabbed frame is decoded and drawn
+FEED_LOCATE_PERIOD = 0.3    # seconds between background QR-outline searches on the preview
+FEED_LOCATE_WIDTH = 640     # preview frames are shrunk to this width for that search
+CAMERA_SIZE = (1280, 720)   # requested desktop capture resolution
+FEED_PREVIEW_BOX = (600, 300)  # the live preview is fitted inside this box
 QUALITY_BRIGHTNESS_MIN = 30
 QUALITY_BRIGHTNESS_MAX = 225
 WEB_PORT = 5443          # HTTPS port — Android requires HTTPS for camera access
 ADMIN_PORT = 5444        # Admin interface on separate port
 CERT_FILE = "docshield.crt"
 KEY_FILE  = "docshield.key"
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024   # uploads larger than this get a 413
 
 # ── Public URL for QR codes (production deployment) ──────────────────────────
 # This is where QR codes will redirect when scanned by any QR scanner
@@ -211,26 +270,54 @@ DATABASE_URL = (
 try:
     import psycopg2
     import psycopg2.extras
+    import psycopg2.extensions
+    import psycopg2.pool
     PSYCOPG2_AVAILABLE = True
+    # JSONB columns (text_features) are decoded client-side on every read
+    psycopg2.extras.register_default_jsonb(loads=json_loads, globally=True)
 except ImportError:
     PSYCOPG2_AVAILABLE = False
     print("  [DB] psycopg2 not installed — run: pip install psycopg2-binary")
 
-_db_conn = None                    # module-level persistent connection
-_db_lock = threading.Lock()        # thread-safe access
+if PSYCOPG2_AVAILABLE:
+    class _PreparingConnection(psycopg2.extensions.connection):
+        """psycopg2 connection that remembers which statements it has PREPAREd."""
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.prepared = set()
+
+DB_POOL_MIN = 1
+DB_POOL_MAX = 10
+
+_db_pool = None                    # module-level connection pool
+_db_lock = threading.Lock()        # guards pool creation only
 _db_failed_time = 0                # timestamp of last failed connection attempt
 _db_failure_cooldown = 30          # seconds between retry attempts after failure
 _db_failure_logged = False         # flag to prevent repeated error messages
 
 
-def _get_conn():
-    """Return a live psycopg2 connection, reconnecting if needed.
-    Uses exponential backoff to prevent spam on network failures."""
-    global _db_conn, _db_failed_time, _db_failure_logged
-    
+def _mark_db_failed(e):
+    """Log a connection failure once and start the retry cooldown."""
+    global _db_failed_time, _db_failure_logged
+    if not _db_failure_logged:
+        error_msg = str(e)
+        if "Name or service not known" in error_msg or "could not translate" in error_msg:
+            print(f"  [DB] Connection failed: Cannot reach Supabase (network/DNS issue)")
+            print(f"  [DB] Details: {error_msg}")
+        else:
+            print(f"  [DB] Reconnect failed: {e}")
+        _db_failure_logged = True
+    _db_failed_time = time.time()  # Start cooldown
+
+
+def _get_pool():
+    """Return the psycopg2 connection pool, creating it if needed.
+    Uses a cooldown to prevent spam on network failures."""
+    global _db_pool, _db_failed_time, _db_failure_logged
+
     if not PSYCOPG2_AVAILABLE:
         return None
-    
+
     # Check if we're in cooldown period after a failure
     if _db_failed_time > 0:
         elapsed = time.time() - _db_failed_time
@@ -239,42 +326,118 @@ def _get_conn():
         # Reset after cooldown expires
         _db_failed_time = 0
         _db_failure_logged = False
-    
+
+    if _db_pool is not None:
+        return _db_pool
     with _db_lock:
+        if _db_pool is None:
+            try:
+                # TCP keepalives stop NAT/pooler idle timeouts from silently
+                # killing connections that sit in the pool between requests
+                _db_pool = psycopg2.pool.ThreadedConnectionPool(
+                    DB_POOL_MIN, DB_POOL_MAX, DATABASE_URL, connect_timeout=10,
+                    keepalives=1, keepalives_idle=30, keepalives_interval=10,
+                    keepalives_count=3, connection_factory=_PreparingConnection)
+            except Exception as e:
+                _mark_db_failed(e)
+                return None
+        return _db_pool
+
+
+@contextmanager
+def _get_conn():
+    """Borrow a live pooled connection for the duration of a ``with`` block.
+    Yields None when the database is unavailable."""
+    pool = _get_pool()
+    conn = None
+    if pool is not None:
         try:
-            if _db_conn is None or _db_conn.closed:
-                _db_conn = psycopg2.connect(DATABASE_URL, connect_timeout=10)
-                _db_conn.autocommit = False
-            else:
-                # ping
-                with _db_conn.cursor() as cur:
-                    cur.execute("SELECT 1")
-                _db_conn.commit()
-            return _db_conn
+            conn = pool.getconn()
+            # ping — drop connections the server has closed while idle
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
         except Exception as e:
-            # Log error only once per failure cycle
-            if not _db_failure_logged:
-                error_msg = str(e)
-                if "Name or service not known" in error_msg or "could not translate" in error_msg:
-                    print(f"  [DB] Connection failed: Cannot reach Supabase (network/DNS issue)")
-                    print(f"  [DB] Details: {error_msg}")
-                else:
-                    print(f"  [DB] Reconnect failed: {e}")
-                _db_failure_logged = True
-            
-            _db_failed_time = time.time()  # Start cooldown
-            _db_conn = None
-            return None
+            if conn is not None:
+                pool.putconn(conn, close=True)
+            conn = None
+            _mark_db_failed(e)
+    if conn is None:
+        yield None
+        return
+    try:
+        yield conn
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+def _execute_prepared(cur, name: str, statement: str, params: tuple):
+    """Run a $n-style statement as a server-side prepared statement.
+    PREPARE happens once per pooled connection; later calls only EXECUTE,
+    so Postgres skips parsing and planning."""
+    conn = cur.connection
+    if name not in conn.prepared:
+        cur.execute(f"PREPARE {name} AS {statement}")
+        conn.prepared.add(name)  # survives rollback — prepared statements are per session
+    placeholders = ",".join(["%s"] * len(params))
+    cur.execute(f"EXECUTE {name} ({placeholders})", params)
+
+
+_DOC_UPSERT = """
+    ON CONFLICT (doc_id) DO UPDATE SET
+        holder_name     = EXCLUDED.holder_name,
+        doc_type        = EXCLUDED.doc_type,
+        issue_date      = EXCLUDED.issue_date,
+        expiry_date     = EXCLUDED.expiry_date,
+        additional      = EXCLUDED.additional,
+        file_hash       = EXCLUDED.file_hash,
+        visual_hash     = EXCLUDED.visual_hash,
+        perceptual_hash = EXCLUDED.perceptual_hash,
+        text_features   = EXCLUDED.text_features,
+        bound_hash      = EXCLUDED.bound_hash,
+        verify_url      = EXCLUDED.verify_url
+"""
+
+_DOC_INSERT = """
+    INSERT INTO documents
+        (doc_id, holder_name, doc_type, issue_date, expiry_date,
+         additional, file_hash, visual_hash, perceptual_hash,
+         text_features, bound_hash, verify_url)
+"""
+
+_SAVE_DOC_SQL = _DOC_INSERT + "VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12)" + _DOC_UPSERT
+_SAVE_DOCS_SQL = _DOC_INSERT + "VALUES %s" + _DOC_UPSERT
+
+
+def _doc_row(doc: dict) -> tuple:
+    """Column values for one documents row, in _DOC_INSERT order.
+    bound_hash and verify_url are always written, so readers never rebuild them."""
+    bound_hash = doc.get("hash") or make_bound_hash(
+        doc["doc_id"], doc["holder_name"], doc["doc_type"],
+        doc["issue_date"], doc.get("file_hash", ""))
+    return (
+        doc["doc_id"], doc["holder_name"], doc["doc_type"],
+        doc["issue_date"], doc.get("expiry_date", ""),
+        doc.get("additional", ""), doc.get("file_hash", ""),
+        doc.get("visual_hash", ""), doc.get("perceptual_hash", ""),
+        psycopg2.extras.Json(doc["text_features"]) if doc.get("text_features") else None,
+        bound_hash, doc.get("verify_url") or build_verify_url(doc["doc_id"], bound_hash),
+    )
 
 
 def init_db():
     """Create the documents table if it does not exist."""
-    conn = _get_conn()
-    if not conn:
-        print("  [DB] 📄 Using local JSON file for document storage.")
-        return False
-    try:
-        with _db_lock:
+    with _get_conn() as conn:
+        if not conn:
+            print("  [DB] 📄 Using local JSON file for document storage.")
+            return False
+        try:
             with conn.cursor() as cur:
                 cur.execute("""
                     CREATE TABLE IF NOT EXISTS documents (
@@ -295,60 +458,113 @@ def init_db():
                     );
                 """)
             conn.commit()
+        except Exception as e:
+            print(f"  [DB] Table creation error: {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return False
+        _migrate_text_features(conn)
+        _ensure_doc_id_index(conn)
         print("  [DB] ✅ Connected to Supabase PostgreSQL — table ready.")
         return True
+
+
+def _migrate_text_features(conn):
+    """Older hand-made tables stored text_features as TEXT; convert once so
+    reads come back decoded and need no client-side json parse. Values that
+    are not valid JSON (e.g. '') become NULL instead of aborting the cast."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT data_type FROM information_schema.columns
+                WHERE table_name = 'documents' AND column_name = 'text_features';
+            """)
+            col = cur.fetchone()
+            if not col or col[0] == "jsonb":
+                conn.rollback()
+                return
+            cur.execute("""
+                CREATE FUNCTION pg_temp.try_jsonb(t TEXT) RETURNS jsonb
+                LANGUAGE plpgsql IMMUTABLE AS $$
+                BEGIN
+                    RETURN NULLIF(t, '')::jsonb;
+                EXCEPTION WHEN others THEN
+                    RETURN NULL;
+                END $$;
+            """)
+            cur.execute("""
+                SELECT doc_id FROM documents
+                WHERE text_features IS NOT NULL AND text_features <> ''
+                  AND pg_temp.try_jsonb(text_features) IS NULL;
+            """)
+            dropped = [row[0] for row in cur.fetchall()]
+            cur.execute("ALTER TABLE documents ALTER COLUMN text_features "
+                        "TYPE jsonb USING pg_temp.try_jsonb(text_features);")
+        conn.commit()
+        print("  [DB] text_features converted to JSONB.")
+        if dropped:
+            print(f"  [DB] ⚠️ {len(dropped)} unreadable text_features cleared: "
+                  + ", ".join(dropped[:20]))
     except Exception as e:
-        print(f"  [DB] Table creation error: {e}")
+        print(f"  [DB] ⚠️ text_features JSONB migration failed ({e}); column left as TEXT.")
         try:
             conn.rollback()
         except Exception:
             pass
-        return False
 
 
-def save_to_registry(doc: dict):
-    """Save document record to PostgreSQL (falls back to local JSON)."""
-    conn = _get_conn()
-    if conn:
+def _ensure_doc_id_index(conn):
+    """Tables created by hand may lack the UNIQUE constraint; lookups and
+    ON CONFLICT (doc_id) both rely on this index. Same name as the
+    constraint's implicit index, so it is a no-op on our own schema.
+    Runs in its own transaction: duplicate doc_ids are logged, not fatal."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS documents_doc_id_key "
+                        "ON documents (doc_id);")
+        conn.commit()
+    except Exception as e:
+        print(f"  [DB] ⚠️ Could not create unique index on doc_id: {e}")
         try:
-            with _db_lock:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        INSERT INTO documents
-                            (doc_id, holder_name, doc_type, issue_date, expiry_date,
-                             additional, file_hash, visual_hash, perceptual_hash,
-                             text_features, bound_hash, verify_url)
-                        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                        ON CONFLICT (doc_id) DO UPDATE SET
-                            holder_name     = EXCLUDED.holder_name,
-                            doc_type        = EXCLUDED.doc_type,
-                            issue_date      = EXCLUDED.issue_date,
-                            expiry_date     = EXCLUDED.expiry_date,
-                            additional      = EXCLUDED.additional,
-                            file_hash       = EXCLUDED.file_hash,
-                            visual_hash     = EXCLUDED.visual_hash,
-                            perceptual_hash = EXCLUDED.perceptual_hash,
-                            text_features   = EXCLUDED.text_features,
-                            bound_hash      = EXCLUDED.bound_hash,
-                            verify_url      = EXCLUDED.verify_url;
-                    """, (
-                        doc["doc_id"], doc["holder_name"], doc["doc_type"],
-                        doc["issue_date"], doc.get("expiry_date", ""),
-                        doc.get("additional", ""), doc.get("file_hash", ""),
-                        doc.get("visual_hash", ""), doc.get("perceptual_hash", ""),
-                        json.dumps(doc.get("text_features")) if doc.get("text_features") else None,
-                        doc.get("hash", ""), doc.get("verify_url", ""),
-                    ))
-                conn.commit()
-            print(f"  [DB] ✅ Saved doc_id={doc['doc_id']} to PostgreSQL.")
-            return
-        except Exception as e:
-            # Silent fallback - DB connection issues already logged in _get_conn()
+            conn.rollback()
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT doc_id, COUNT(*) FROM documents
+                    GROUP BY doc_id HAVING COUNT(*) > 1
+                    ORDER BY doc_id LIMIT 20;
+                """)
+                dupes = cur.fetchall()
+            conn.rollback()
+            if dupes:
+                print("  [DB] Duplicate doc_ids (resolve these, then restart): "
+                      + ", ".join(f"{doc_id} ×{n}" for doc_id, n in dupes))
+        except Exception:
             try:
                 conn.rollback()
             except Exception:
                 pass
 
+
+def save_to_registry(doc: dict):
+    """Save document record to PostgreSQL (falls back to local JSON)."""
+    with _get_conn() as conn:
+        if conn:
+            try:
+                with conn.cursor() as cur:
+                    _execute_prepared(cur, "save_doc", _SAVE_DOC_SQL, _doc_row(doc))
+                conn.commit()
+                print(f"  [DB] ✅ Saved doc_id={doc['doc_id']} to PostgreSQL.")
+                _registry_changed([doc["doc_id"]])
+                return
+            except Exception as e:
+                # Silent fallback - DB connection issues already logged in _get_conn()
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+
     # ── JSON fallback ──
     records = []
     if os.path.exists(DB_FILE):
@@ -357,14 +573,50 @@ def save_to_registry(doc: dict):
     records.append({"document": doc, "issued_date": datetime.now().isoformat()})
     with open(DB_FILE, "w") as f:
         json.dump(records, f, indent=2)
+    _registry_changed([doc["doc_id"]])
+
+
+def save_batch_to_registry(docs: list):
+    """Save many document records in one round-trip per page (falls back to local JSON)."""
+    if not docs:
+        return
+    # ON CONFLICT cannot touch the same row twice in one statement — last one wins
+    unique = list({doc["doc_id"]: doc for doc in docs}.values())
+    with _get_conn() as conn:
+        if conn:
+            try:
+                with conn.cursor() as cur:
+                    psycopg2.extras.execute_values(
+                        cur, _SAVE_DOCS_SQL, [_doc_row(doc) for doc in unique],
+                        page_size=500)
+                conn.commit()
+                print(f"  [DB] ✅ Saved {len(unique)} documents to PostgreSQL.")
+                _registry_changed([doc["doc_id"] for doc in unique])
+                return
+            except Exception as e:
+                # Silent fallback - DB connection issues already logged in _get_conn()
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+
+    # ── JSON fallback ──
+    records = []
+    if os.path.exists(DB_FILE):
+        with open(DB_FILE) as f:
+            records = json.load(f)
+    issued = datetime.now().isoformat()
+    records.extend({"document": doc, "issued_date": issued} for doc in docs)
+    with open(DB_FILE, "w") as f:
+        json.dump(records, f, indent=2)
+    _registry_changed([doc["doc_id"] for doc in docs])
 
 
 def load_registry() -> list:
     """Load all document records from PostgreSQL (falls back to local JSON)."""
-    conn = _get_conn()
-    if conn:
-        try:
-            with _db_lock:
+    with _get_conn() as conn:
+        if conn:
+            try:
                 with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
                     cur.execute("""
                         SELECT doc_id, holder_name, doc_type, issue_date, expiry_date,
@@ -374,31 +626,112 @@ def load_registry() -> list:
                         FROM documents ORDER BY issued_at DESC;
                     """)
                     rows = cur.fetchall()
-            records = []
-            for row in rows:
-                d = dict(row)
-                # Normalise text_features (stored as JSONB → dict)
-                if d.get("text_features") and isinstance(d["text_features"], str):
-                    try:
-                        d["text_features"] = json.loads(d["text_features"])
-                    except Exception:
-                        d["text_features"] = None
-                records.append({
-                    "document": d,
-                    "issued_date": d.get("timestamp", ""),
-                })
-            return records
-        except Exception as e:
-            # Silent fallback - DB connection issues already logged in _get_conn()
-            pass
+                conn.rollback()  # end the read-only transaction before returning the conn
+                records = []
+                for row in rows:
+                    d = dict(row)  # text_features is JSONB, already decoded to a dict
+                    records.append({
+                        "document": d,
+                        "issued_date": d.get("timestamp", ""),
+                    })
+                return records
+            except Exception as e:
+                # Silent fallback - DB connection issues already logged in _get_conn()
+                pass
+
+    # ── JSON fallback ──
+    return _load_local_registry()
+
+
+_SUMMARY_SQL = """
+    SELECT doc_id, holder_name, doc_type, issue_date, issued_at::text
+    FROM documents ORDER BY issued_at DESC;
+"""
+
+
+def _summary_record(row) -> dict:
+    doc_id, holder, doc_type, issue_date, issued = row
+    return {"document": {"doc_id": doc_id, "holder_name": holder,
+                         "doc_type": doc_type, "issue_date": issue_date},
+            "issued_date": issued or ""}
+
+
+def load_registry_summary() -> list:
+    """Like load_registry(), but only the columns the listings show — no
+    fingerprints or text features (falls back to local JSON)."""
+    with _get_conn() as conn:
+        if conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(_SUMMARY_SQL)
+                    rows = cur.fetchall()
+                conn.rollback()  # end the read-only transaction before returning the conn
+                return [_summary_record(row) for row in rows]
+            except Exception as e:
+                # Silent fallback - DB connection issues already logged in _get_conn()
+                pass
+
+    # ── JSON fallback ──
+    return _load_local_registry()
+
+
+def iter_registry_summary():
+    """Yield the same records as load_registry_summary() one at a time.
+    PostgreSQL rows come through a server-side cursor, so neither side holds
+    the whole registry in memory (falls back to local JSON)."""
+    with _get_conn() as conn:
+        if conn:
+            started = False
+            try:
+                with conn.cursor(name="registry_summary") as cur:
+                    cur.itersize = 1000
+                    cur.execute(_SUMMARY_SQL)
+                    for row in cur:
+                        started = True
+                        yield _summary_record(row)
+                conn.rollback()  # end the read-only transaction before returning the conn
+                return
+            except Exception as e:
+                if started:  # part of the listing is already out; don't append another source
+                    raise
+                # Silent fallback - DB connection issues already logged in _get_conn()
 
     # ── JSON fallback ──
+    yield from _load_local_registry()
+
+
+def _load_local_registry() -> list:
+    """Read the local JSON fallback registry."""
     if not os.path.exists(DB_FILE):
         return []
     with open(DB_FILE) as f:
         return json.load(f)
 
 
+_registry_index = {}               # doc_id -> record, built from DB_FILE
+_registry_stamp = None             # (mtime_ns, size) of DB_FILE when indexed
+_registry_lock = threading.RLock()
+
+
+def get_registry_index() -> dict:
+    """Map doc_id -> record for the local JSON registry.
+    Re-parsed only when the file changes on disk."""
+    global _registry_index, _registry_stamp
+    try:
+        st = os.stat(DB_FILE)
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    with _registry_lock:
+        if stamp != _registry_stamp:
+            index = {}
+            for rec in _load_local_registry():
+                # first record wins, matching the old linear scan
+                index.setdefault(rec.get("document", {}).get("doc_id"), rec)
+            _registry_index, _registry_stamp = index, stamp
+        return _registry_index
+
+
 def generate_self_signed_cert(cert_path: str, key_path: str, ip: str) -> bool:
     """Generate a self-signed TLS certificate so Flask can serve HTTPS.
     Android Chrome blocks getUserMedia() on plain HTTP for non-localhost origins.
@@ -448,17 +781,27 @@ def generate_self_signed_cert(cert_path: str, key_path: str, ip: str) -> bool:
         return False
 
 def get_local_ip():
-    """Get the machine's LAN IP so phones on same WiFi can connect."""
+    """Get the machine's LAN IP so phones on same WiFi can connect.
+    Runs once at import, so it must never block on the network."""
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
-    except:
-        return "127.0.0.1"
+        # UDP connect() sends nothing; it only picks the outbound interface
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.settimeout(0.5)
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+    except OSError:
+        pass
+    try:
+        # Offline: first non-loopback address bound to this host name
+        for ip in socket.gethostbyname_ex(socket.gethostname())[2]:
+            if not ip.startswith("127."):
+                return ip
+    except OSError:
+        pass
+    return "127.0.0.1"
 
 LOCAL_IP = get_local_ip()
+LOCAL_BASE_URL = f"https://{LOCAL_IP}:{WEB_PORT}"
 
 # =============================================================================
 # CORE HASHING FUNCTIONS  (unchanged from original)
@@ -467,61 +810,119 @@ LOCAL_IP = get_local_ip()
 def hash_bytes(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
-def visual_fingerprint(img: Image.Image) -> str:
-    gray = img.convert("L").copy()
-    w, h = gray.size
-    draw = ImageDraw.Draw(gray)
+def _stamp_corner(pixels: np.ndarray, fill: int) -> np.ndarray:
+    """Blank the bottom-right corner where the QR stamp sits (in place)."""
+    h, w = pixels.shape[:2]
     stamp = int(min(w, h) * 0.30)
-    draw.rectangle([w - stamp, h - stamp, w, h], fill=128)
-    thumb = gray.resize((VISUAL_SIZE, VISUAL_SIZE), Image.LANCZOS)
+    pixels[h - stamp:, w - stamp:] = fill
+    return pixels
+
+def _visual_from_stamped(stamped: np.ndarray) -> str:
+    # Stays on PIL LANCZOS: this digest is matched exactly against the registry
+    thumb = Image.fromarray(stamped).resize((VISUAL_SIZE, VISUAL_SIZE), Image.LANCZOS)
     return hashlib.sha256(thumb.tobytes()).hexdigest()
 
-def perceptual_hash(img: Image.Image) -> str:
+def _phash_from_stamped(stamped: np.ndarray) -> str:
+    small = cv2.resize(stamped, (PERCEPTUAL_SIZE, PERCEPTUAL_SIZE),
+                       interpolation=cv2.INTER_AREA)
+    pixels = small.astype(np.float32)
+    # 2D DCT, keep the 8x8 low-frequency block
+    freq = dctn(pixels, type=2, norm="ortho")
+    low = np.ascontiguousarray(freq[:8, :8], dtype=np.float32).ravel()
+    return PHASH_PREFIX + format(int(_phash_bits(low)), '016x')
+
+def _ahash_from_stamped(stamped: np.ndarray) -> str:
+    """Legacy 8x8 average hash, kept so documents issued before the DCT
+    pHash still compare against the scheme they were stored with."""
+    small = Image.fromarray(stamped).resize((8, 8), Image.LANCZOS)
+    pixels = np.asarray(small, dtype=np.float32)
+    packed = np.packbits((pixels > pixels.mean()).ravel(), bitorder="little")
+    return format(int.from_bytes(packed.tobytes(), "little"), '016x')
+
+def _phash_value(phash: str) -> int:
+    """The 64 hash bits of a stored pHash, with or without PHASH_PREFIX."""
+    return int(phash.removeprefix(PHASH_PREFIX)[:16], 16)
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _phash_bits(low):
+        """Threshold 64 DCT coefficients at their median (DC excluded) into a
+        uint64; bit i is coefficient i."""
+        med = np.median(low[1:])
+        bits = np.uint64(0)
+        for i in range(64):
+            if low[i] > med:
+                bits |= np.uint64(1) << np.uint64(i)
+        return bits
+else:
+    # Interpreted, the loop above costs ~35 us per hash; packbits is the same layout
+    def _phash_bits(low):
+        packed = np.packbits(low > np.median(low[1:]), bitorder="little")
+        return np.frombuffer(packed.tobytes(), dtype="<u8")[0]
+
+def hamming_similarity(query, stored):
+    """Similarity (1 - Hamming/64) between one uint64 pHash and an array of them."""
+    return 1.0 - np.bitwise_count(stored ^ query).astype(np.float32) / 64.0
+
+def _text_features_from_gray(gray: Image.Image) -> dict:
+    enhanced = ImageEnhance.Contrast(gray).enhance(2.0)
+    w, h = enhanced.size
+    pixels = _stamp_corner(np.array(enhanced), 255)
+    return {
+        'mean_intensity': float(np.mean(pixels, dtype=np.float32)),
+        'std_intensity': float(np.std(pixels, dtype=np.float32)),
+        'size_ratio': w / h,
+        'pixel_count': w * h
+    }
+
+def compute_fingerprints(img: Image.Image) -> dict:
+    """
+    Visual hash, perceptual hash and text features from one grayscale pass.
+    Same values as calling the three functions below separately.
+    """
+    gray = img.convert("L")
+    stamped = _stamp_corner(np.array(gray), 128)
+    visual_hash = _visual_from_stamped(stamped)
+    try:
+        phash = _phash_from_stamped(stamped)
+    except Exception:
+        phash = visual_hash[:16]
+    try:
+        text_feat = _text_features_from_gray(gray)
+    except Exception:
+        text_feat = None
+    return {"visual_hash": visual_hash, "perceptual_hash": phash,
+            "text_features": text_feat}
+
+def visual_fingerprint(img: Image.Image) -> str:
+    return _visual_from_stamped(_stamp_corner(np.array(img.convert("L")), 128))
+
+def perceptual_hash(img: Image.Image, like: str = None) -> str:
+    """DCT pHash of img, or the legacy average hash when the stored hash it
+    will be compared against (like) predates PHASH_PREFIX."""
     try:
-        gray = img.convert("L")
-        w, h = gray.size
-        draw = ImageDraw.Draw(gray)
-        stamp = int(min(w, h) * 0.30)
-        draw.rectangle([w - stamp, h - stamp, w, h], fill=128)
-        small = gray.resize((8, 8), Image.LANCZOS)
-        pixels = np.array(small).astype(float)
-        avg = np.mean(pixels)
-        hash_bits = (pixels > avg).flatten()
-        hash_int = 0
-        for i, bit in enumerate(hash_bits[:64]):
-            if bit:
-                hash_int |= (1 << i)
-        return format(hash_int, '016x')
+        stamped = _stamp_corner(np.array(img.convert("L")), 128)
+        if like and not like.startswith(PHASH_PREFIX):
+            return _ahash_from_stamped(stamped)
+        return _phash_from_stamped(stamped)
     except Exception:
         return visual_fingerprint(img)[:16]
 
 def compare_perceptual_hash(hash1: str, hash2: str) -> float:
     if not hash1 or not hash2 or len(hash1) < 16 or len(hash2) < 16:
         return 0.0
+    # A DCT pHash and a legacy average hash share no bit meaning
+    if hash1.startswith(PHASH_PREFIX) != hash2.startswith(PHASH_PREFIX):
+        return 0.0
     try:
-        h1_bin = bin(int(hash1[:16], 16))[2:].zfill(64)
-        h2_bin = bin(int(hash2[:16], 16))[2:].zfill(64)
-        matches = sum(c1 == c2 for c1, c2 in zip(h1_bin, h2_bin))
-        return matches / 64.0
+        distance = (_phash_value(hash1) ^ _phash_value(hash2)).bit_count()
+        return 1.0 - distance / 64.0
     except Exception:
         return 0.0
 
 def extract_text_features(img: Image.Image):
     try:
-        gray = img.convert("L")
-        enhancer = ImageEnhance.Contrast(gray)
-        enhanced = enhancer.enhance(2.0)
-        w, h = enhanced.size
-        draw = ImageDraw.Draw(enhanced)
-        stamp = int(min(w, h) * 0.30)
-        draw.rectangle([w - stamp, h - stamp, w, h], fill=255)
-        pixels = np.array(enhanced)
-        return {
-            'mean_intensity': float(np.mean(pixels)),
-            'std_intensity': float(np.std(pixels)),
-            'size_ratio': w / h,
-            'pixel_count': w * h
-        }
+        return _text_features_from_gray(img.convert("L"))
     except Exception:
         return None
 
@@ -548,12 +949,51 @@ def compare_text_features(stored, uploaded) -> float:
         pass
     return 0.5
 
+# Shared by request threads; the two feature kernels release the GIL in PIL/numpy/cv2
+_VERIFY_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="verify")
+
+PHASH_DECIDED = object()   # physical_features: text skipped, the pHash alone accepts the match
+
+def physical_features(img: Image.Image, with_text: bool = True, reference_phash: str = None):
+    """Perceptual hash and (optionally) text features, computed concurrently.
+    Returns (phash, text_features); text_features is None if not requested or
+    if the pHash alone already rejects the match against reference_phash, and
+    PHASH_DECIDED if it alone already accepts it."""
+    text_future = _VERIFY_POOL.submit(extract_text_features, img) if with_text else None
+    phash = perceptual_hash(img, reference_phash)
+    if text_future and reference_phash:
+        score = compare_perceptual_hash(reference_phash, phash)
+        if score < PHASH_REJECT_SCORE:
+            text_future.cancel()
+            return phash, None
+        if score >= PHASH_ACCEPT_SCORE:
+            text_future.cancel()
+            return phash, PHASH_DECIDED
+    return phash, (text_future.result() if text_future else None)
+
+def physical_confidence(img: Image.Image, doc: dict) -> float:
+    """0.7 * pHash + 0.3 * text-feature similarity of img against doc. When
+    the pHash alone accepts the match the text step is skipped and the pHash
+    score is reported as is, rather than averaged with a neutral 0.5."""
+    phash, text_feat = physical_features(img, bool(doc.get("text_features")),
+                                         doc["perceptual_hash"])
+    phash_score = compare_perceptual_hash(doc["perceptual_hash"], phash)
+    if text_feat is PHASH_DECIDED:
+        return phash_score
+    text_score = 0.5
+    if doc.get("text_features"):
+        text_score = compare_text_features(doc["text_features"], text_feat)
+    return phash_score * 0.7 + text_score * 0.3
+
 def check_photo_quality(img: Image.Image):
+    return check_photo_quality_gray(np.asarray(img.convert("L")))
+
+def check_photo_quality_gray(gray: np.ndarray):
+    """check_photo_quality on an 8-bit grayscale array (e.g. straight from a
+    camera frame, skipping the PIL round-trip)."""
     try:
-        img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-        gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-        blur_variance = cv2.Laplacian(gray, cv2.CV_64F).var()
-        mean_brightness = np.mean(gray)
+        blur_variance = cv2.Laplacian(gray, cv2.CV_32F).var()
+        mean_brightness = gray.mean(dtype=np.float32)
         quality_score = 100
         if blur_variance < QUALITY_BLUR_THRESHOLD:
             quality_score -= 30
@@ -569,11 +1009,10 @@ def check_photo_quality(img: Image.Image):
 
 def preprocess_photo(img: Image.Image) -> Image.Image:
     try:
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(1.3)
-        enhancer = ImageEnhance.Sharpness(img)
-        img = enhancer.enhance(1.2)
-        return img
+        contrasted = ImageEnhance.Contrast(img).enhance(1.3)
+        sharpened = ImageEnhance.Sharpness(contrasted).enhance(1.2)
+        contrasted.close()
+        return sharpened
     except Exception:
         return img
 
@@ -581,39 +1020,103 @@ def preprocess_photo(img: Image.Image) -> Image.Image:
 # DOCUMENT PROCESSING
 # =============================================================================
 
-def file_to_pil(path: str, dpi: int = 150) -> Image.Image:
+def _render_first_page(doc, dpi: int, max_size: tuple = None) -> Image.Image:
+    """Rasterise page 1 of an open fitz document and close it. With max_size,
+    the DPI is lowered so the page renders no larger than the box it must fit."""
+    try:
+        if max_size:
+            rect = doc[0].rect
+            dpi = min(dpi, 72 * min(max_size[0] / rect.width, max_size[1] / rect.height))
+        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        pix = doc[0].get_pixmap(matrix=mat, alpha=False)
+        return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    finally:
+        doc.close()
+
+def file_to_pil(path: str, dpi: int = 150, max_size: tuple = None) -> Image.Image:
+    """Load a document as RGB. max_size is a hint for preview callers that
+    thumbnail the result: PDFs render and JPEGs decode at a reduced scale
+    that still covers it. Verification keeps the default full render —
+    the stored fingerprints were taken from it."""
     ext = os.path.splitext(path)[1].lower()
     if ext == ".pdf":
         if not PYMUPDF_AVAILABLE:
             raise RuntimeError("Please install PyMuPDF: pip install pymupdf")
-        doc = fitz.open(path)
-        mat = fitz.Matrix(dpi / 72, dpi / 72)
-        pix = doc[0].get_pixmap(matrix=mat, alpha=False)
-        doc.close()
-        return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        return _render_first_page(fitz.open(path), dpi, max_size)
     else:
-        return Image.open(path).convert("RGB")
+        with Image.open(path) as img:
+            if max_size:
+                img.draft("RGB", max_size)  # JPEG only: DCT-domain downscale
+            return img.convert("RGB")
 
 def pil_from_bytes(data: bytes, filename: str = "") -> Image.Image:
     """Load PIL image from raw bytes (for web uploads)."""
     ext = os.path.splitext(filename)[1].lower() if filename else ""
     if ext == ".pdf":
-        if not PYMUPDF_AVAILABLE:
-            raise RuntimeError("Install PyMuPDF: pip install pymupdf")
-        tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
-        tmp.write(data)
-        tmp.close()
-        try:
-            return file_to_pil(tmp.name)
-        finally:
-            os.unlink(tmp.name)
+        return _pil_from_pdf_bytes(data)
     else:
         return Image.open(io.BytesIO(data)).convert("RGB")
 
+def _pil_from_pdf_bytes(data: bytes) -> Image.Image:
+    if not PYMUPDF_AVAILABLE:
+        raise RuntimeError("Install PyMuPDF: pip install pymupdf")
+    return _render_first_page(fitz.open(stream=data, filetype="pdf"), 150)
+
+_UPLOAD_EXTS = {".pdf", ".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"}
+_UPLOAD_MIMES = {"application/pdf", "image/png", "image/jpeg", "image/bmp",
+                 "image/x-ms-bmp", "image/tiff"}
+_UPLOAD_FORMATS = ("PNG", "JPEG", "BMP", "TIFF")   # PIL decoders tried on image uploads
+
+def upload_supported(f) -> bool:
+    """True when an upload is one of the accepted document types (by
+    extension, or by Content-Type when the name has no usable extension)."""
+    ext = os.path.splitext(f.filename or "")[1].lower()
+    if ext:
+        return ext in _UPLOAD_EXTS
+    return f.mimetype in _UPLOAD_MIMES
+
+def _is_pdf_upload(f) -> bool:
+    """Same precedence as upload_supported: extension first, Content-Type
+    only when the name has no extension."""
+    ext = os.path.splitext(f.filename or "")[1].lower()
+    return ext == ".pdf" if ext else f.mimetype == "application/pdf"
+
+def pil_from_upload(f) -> Image.Image:
+    """Load PIL image from a Werkzeug upload. Images are decoded straight from
+    the (possibly disk-spooled) upload stream instead of a bytes copy."""
+    if _is_pdf_upload(f):
+        return _pil_from_pdf_bytes(f.read())  # PyMuPDF needs the whole buffer
+    with Image.open(f.stream, formats=_UPLOAD_FORMATS) as img:
+        return img.convert("RGB")
+
+def upload_sha256(f) -> str:
+    """SHA-256 of an upload; the stream is rewound afterwards.
+    file_digest hashes in-memory uploads straight from their buffer and
+    spooled ones through a single reused read buffer."""
+    digest = hashlib.file_digest(f.stream, "sha256").hexdigest()
+    f.stream.seek(0)
+    return digest
+
+@lru_cache(maxsize=4096)
 def make_bound_hash(doc_id, holder, doc_type, issue_date, file_hash):
     raw = f"{doc_id}|{holder}|{doc_type}|{issue_date}|{file_hash}"
     return hashlib.sha256(raw.encode()).hexdigest()
 
+def encode_qr_hash(bound_hash: str) -> str:
+    """Short QR form of a bound hash: first 128 bits, base64url, unpadded (22 chars)."""
+    return base64.urlsafe_b64encode(bytes.fromhex(bound_hash)[:16]).rstrip(b"=").decode()
+
+def qr_hash_matches(qr_hash: str, bound_hash: str) -> bool:
+    """Check a hash read from a QR against the registry's bound hash.
+    Accepts both the short base64url form and legacy 64-char hex."""
+    try:
+        if len(qr_hash) == 64:
+            return hmac.compare_digest(qr_hash, bound_hash)
+        return hmac.compare_digest(qr_hash, encode_qr_hash(bound_hash))
+    except (TypeError, ValueError):
+        # non-ASCII input or a malformed registry hash
+        return False
+
 def make_qr_payload(doc_id, bound_hash, verify_url=None):
     """QR payload now includes the web verify URL so phone scanners redirect there."""
     data = {"doc_id": doc_id, "hash": bound_hash}
@@ -625,6 +1128,52 @@ def make_qr_payload(doc_id, bound_hash, verify_url=None):
         return verify_url  # URL format: http://IP:5000/?verify=DOCID&hash=HASH
     return json.dumps(data, separators=(",", ":"))
 
+# The exact tail build_verify_url writes; anything else takes the general parse
+_VERIFY_URL_RE = re.compile(r"[?&]verify=([^&#]+)&hash=([^&#]+)$")
+
+def parse_qr_payload(qr_str: str):
+    """Inverse of make_qr_payload: return (doc_id, hash) from a verify URL or
+    JSON payload, either of which may be None."""
+    qr_str = qr_str.strip()
+    m = _VERIFY_URL_RE.search(qr_str)
+    if m:
+        from urllib.parse import unquote_plus
+        doc_id, qr_hash = m.groups()
+        if "%" in doc_id or "+" in doc_id:
+            doc_id = unquote_plus(doc_id)
+        if "%" in qr_hash or "+" in qr_hash:
+            qr_hash = unquote_plus(qr_hash)
+        return doc_id, qr_hash
+
+    is_json = qr_str[:1] == "{"
+    is_url = qr_str.startswith(("http://", "https://", "docshield://"))
+    doc_id, qr_hash = None, None
+
+    if not is_json:
+        try:
+            from urllib.parse import urlparse, unquote_plus
+            # Only two keys matter — scan the query once instead of parse_qs
+            for pair in urlparse(qr_str).query.split("&"):
+                key, _, value = pair.partition("=")
+                if not value:
+                    continue
+                if key == "verify" and doc_id is None:
+                    doc_id = unquote_plus(value)
+                elif key == "hash" and qr_hash is None:
+                    qr_hash = unquote_plus(value)
+        except Exception:
+            pass
+
+    if not doc_id and not is_url:
+        try:
+            payload = json_loads(qr_str)
+            doc_id = payload.get("doc_id", "").strip()
+            qr_hash = payload.get("hash", "").strip()
+        except Exception:
+            pass
+
+    return doc_id, qr_hash
+
 def build_verify_url(doc_id: str, bound_hash: str, use_public: bool = True) -> str:
     """
     Build the full verify URL that will be embedded in QR codes.
@@ -643,47 +1192,51 @@ def build_verify_url(doc_id: str, bound_hash: str, use_public: bool = True) -> s
         base = PUBLIC_URL
     else:
         # For local LAN only - use local IP
-        base = f"https://{LOCAL_IP}:{WEB_PORT}"
+        base = LOCAL_BASE_URL
     
-    return f"{base}/?verify={doc_id}&hash={bound_hash}"
+    return f"{base}/?verify={doc_id}&hash={encode_qr_hash(bound_hash)}"
 
 def generate_qr_pil(payload: str, size_px: int = 300) -> Image.Image:
     qr = qrcode.QRCode(version=None, box_size=10, border=3,
                        error_correction=qrcode.constants.ERROR_CORRECT_M)
     qr.add_data(payload)
     qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
+    # One pixel per module (border included), skipping qrcode's per-module drawing
+    matrix = np.array(qr.get_matrix(), dtype=bool)
+    img = Image.fromarray(np.where(matrix, 0, 255).astype(np.uint8), "L").convert("RGB")
     return img.resize((size_px, size_px), Image.NEAREST)
 
 def embed_qr_into_pdf(src_path: str, qr_pil: Image.Image, out_path: str):
     if not PYMUPDF_AVAILABLE:
         raise RuntimeError("Please install PyMuPDF: pip install pymupdf")
-    tmp = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
-    qr_pil.save(tmp.name)
-    tmp.close()
-    try:
-        doc = fitz.open(src_path)
-        page = doc[0]
-        pw, ph = page.rect.width, page.rect.height
-        qr_size = min(pw, ph) * QR_FRACTION
-        margin = 14
-        label_h = 14
-        x1 = pw - qr_size - margin
-        y1 = ph - qr_size - margin - label_h
-        x2 = pw - margin
-        y2 = ph - margin - label_h
-        page.draw_rect(
-            fitz.Rect(x1 - 5, y1 - 5, x2 + 5, ph - margin + 3),
-            color=(0.85, 0.85, 0.85), fill=(1, 1, 1))
-        page.insert_image(fitz.Rect(x1, y1, x2, y2), filename=tmp.name)
-        page.insert_text(
-            fitz.Point(x1, ph - margin - 1),
-            "SECURITY QR — Scan to verify",
-            fontsize=6.5, color=(0.3, 0.3, 0.3))
-        doc.save(out_path, garbage=4, deflate=True)
-        doc.close()
-    finally:
-        os.unlink(tmp.name)
+    png = io.BytesIO()
+    qr_pil.save(png, format="PNG")
+    doc = fitz.open(src_path)
+    page = doc[0]
+    pw, ph = page.rect.width, page.rect.height
+    qr_size = min(pw, ph) * QR_FRACTION
+    margin = 14
+    label_h = 14
+    x1 = pw - qr_size - margin
+    y1 = ph - qr_size - margin - label_h
+    x2 = pw - margin
+    y2 = ph - margin - label_h
+    page.draw_rect(
+        fitz.Rect(x1 - 5, y1 - 5, x2 + 5, ph - margin + 3),
+        color=(0.85, 0.85, 0.85), fill=(1, 1, 1))
+    page.insert_image(fitz.Rect(x1, y1, x2, y2), stream=png.getvalue())
+    page.insert_text(
+        fitz.Point(x1, ph - margin - 1),
+        "SECURITY QR — Scan to verify",
+        fontsize=6.5, color=(0.3, 0.3, 0.3))
+    doc.save(out_path, garbage=4, deflate=True)
+    doc.close()
+
+# Label font for embed_qr_into_image, loaded once
+try:
+    _QR_FONT = ImageFont.truetype("arial.ttf", 10)
+except Exception:
+    _QR_FONT = ImageFont.load_default()
 
 def embed_qr_into_image(src_path: str, qr_pil: Image.Image, out_path: str):
     base = Image.open(src_path).convert("RGB")
@@ -696,12 +1249,8 @@ def embed_qr_into_image(src_path: str, qr_pil: Image.Image, out_path: str):
     box_h = qr_size + margin * 2 + label_h
     backing = Image.new("RGB", (box_w, box_h), (255, 255, 255))
     draw = ImageDraw.Draw(backing)
-    try:
-        font = ImageFont.truetype("arial.ttf", 10)
-    except:
-        font = ImageFont.load_default()
     draw.text((4, qr_size + margin + 2), "SECURITY QR — Scan to verify",
-              fill=(80, 80, 80), font=font)
+              fill=(80, 80, 80), font=_QR_FONT)
     draw.rectangle([0, 0, box_w - 1, box_h - 1], outline=(160, 160, 160), width=1)
     backing.paste(qr_img, (margin, margin))
     bx = bw - box_w - margin
@@ -722,128 +1271,106 @@ def extract_qr_from_array(frame: np.ndarray):
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     else:
         gray = frame
-    
-    # Primary detection attempt
-    codes = decode(gray)
-    if codes:
-        try:
-            return codes[0].data.decode()
-        except:
-            return codes[0].data if isinstance(codes[0].data, str) else None
-    
-    # Strategy 1: Try with stronger CLAHE
-    clahe = cv2.createCLAHE(clipLimit=4.0, tileGridSize=(4, 4))
-    enhanced = clahe.apply(gray)
-    codes = decode(enhanced)
-    if codes:
-        try:
-            return codes[0].data.decode()
-        except:
-            return codes[0].data if isinstance(codes[0].data, str) else None
-    
-    # Strategy 2: Try Gaussian blur to reduce noise
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    codes = decode(blurred)
-    if codes:
-        try:
-            return codes[0].data.decode()
-        except:
-            return codes[0].data if isinstance(codes[0].data, str) else None
-    
-    # Strategy 3: Try median blur
-    median = cv2.medianBlur(gray, 5)
-    codes = decode(median)
-    if codes:
-        try:
-            return codes[0].data.decode()
-        except:
-            return codes[0].data if isinstance(codes[0].data, str) else None
-    
-    # Strategy 4: Multiple scale attempts with preprocessing
-    for scale in [0.7, 1.3, 1.5]:
+    return _decode_qr_gray(gray)
+
+def _qr_text(codes):
+    if not codes:
+        return None
+    try:
+        return codes[0].data.decode()
+    except:
+        return codes[0].data if isinstance(codes[0].data, str) else None
+
+def _qr_fallback_variants(gray: np.ndarray) -> list:
+    """Preprocessed copies of gray for _decode_qr_gray, in priority order.
+    Each entry is a callable so the filter itself runs on a pool thread."""
+    def rescaled(scale):
         resized = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(resized)
-        codes = decode(enhanced)
-        if codes:
-            try:
-                return codes[0].data.decode()
-            except:
-                return codes[0].data if isinstance(codes[0].data, str) else None
-    
-    # Strategy 5: Try adapted thresholding
-    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                   cv2.THRESH_BINARY, 11, 2)
-    codes = decode(thresh)
-    if codes:
-        try:
-            return codes[0].data.decode()
-        except:
-            return codes[0].data if isinstance(codes[0].data, str) else None
-    
-    # Strategy 6: Unsharp masking to enhance details
-    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-    blurred_img = cv2.GaussianBlur(gray, (0, 0), 2.0)
-    sharpened = cv2.addWeighted(gray, 1.5, blurred_img, -0.5, 0)
-    codes = decode(sharpened)
-    if codes:
-        try:
-            return codes[0].data.decode()
-        except:
-            return codes[0].data if isinstance(codes[0].data, str) else None
-    
-    return None
+        return _get_clahe(2.0, 8).apply(resized)
+
+    def unsharp():
+        blurred_img = cv2.GaussianBlur(gray, (0, 0), 2.0)
+        return cv2.addWeighted(gray, 1.5, blurred_img, -0.5, 0)
+
+    return [
+        lambda: _get_clahe(4.0, 4).apply(gray),                   # stronger CLAHE
+        lambda: cv2.GaussianBlur(gray, (5, 5), 0),                # reduce noise
+        lambda: cv2.medianBlur(gray, 5),
+        *(lambda s=s: rescaled(s) for s in (0.7, 1.3, 1.5)),     # multiple scales
+        lambda: cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                      cv2.THRESH_BINARY, 11, 2),
+        unsharp,                                                  # enhance details
+    ]
+
+def _decode_variant(make):
+    return _qr_text(decode(make()))
+
+# Fallback variants are independent and OpenCV releases the GIL, so they run side by side
+_QR_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="qr")
+
+def _decode_qr_gray(gray: np.ndarray):
+    """QR decode strategies on a single-channel image (see extract_qr_from_array)."""
+    # Primary detection attempt — most readable codes stop here, so the
+    # fallbacks are only fanned out once it has failed
+    text = _qr_text(decode(gray))
+    if text:
+        return text
+
+    futures = [_QR_POOL.submit(_decode_variant, make) for make in _qr_fallback_variants(gray)]
+    try:
+        # Taken in priority order, so the answer does not depend on timing
+        for fut in futures:
+            text = fut.result()
+            if text:
+                return text
+        return None
+    finally:
+        for fut in futures:
+            fut.cancel()
 
 def extract_qr_from_pil(pil_img: Image.Image):
     """Extract QR code string from a PIL image."""
-    frame = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
-    return extract_qr_from_array(frame)
+    gray = np.asarray(pil_img.convert("L"))
+    if gray.size == 0:
+        return None
+    return _decode_qr_gray(gray)
 
 def hash_image_array_camera(arr: np.ndarray) -> str:
     small = cv2.resize(arr, (128, 128), interpolation=cv2.INTER_AREA)
     gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
-    return hashlib.sha256(gray.tobytes()).hexdigest()
+    # Hash the pixel buffer in place, one call, no tobytes() copy
+    return hashlib.sha256(memoryview(np.ascontiguousarray(gray))).hexdigest()
 
 # =============================================================================
 # UNIFIED VERIFY FUNCTION  (used by both GUI and web API)
 # =============================================================================
 
-def verify_document_full(pil_img: Image.Image, is_physical: bool = False,
-                          doc_id_hint: str = None, hash_hint: str = None):
+def _resolve_document(pil_img: Image.Image, is_physical: bool, doc_id_hint: str,
+                      hash_hint: str, require_qr: bool):
     """
-    Full document verification.
-    Tries:
-      1. QR code embedded in the document image
-      2. URL params (doc_id_hint + hash_hint) passed from web UI
-    Returns dict: {valid, verdict, message, document, confidence}
+    Steps 1-4 shared by both verification modes: find the doc_id, look it up
+    and check the QR hash. Returns (doc, None) when content verification
+    should go ahead, otherwise (doc or None, failure result).
     """
     doc_id = None
     qr_hash = None
 
     # ── Step 1: Try to read QR from image ──
-    qr_str = extract_qr_from_pil(pil_img)
-
-    if qr_str:
-        # Could be a URL or JSON
-        try:
-            # Try URL first
-            from urllib.parse import urlparse, parse_qs
-            parsed = urlparse(qr_str)
-            params = parse_qs(parsed.query)
-            if "verify" in params:
-                doc_id = params["verify"][0]
-            if "hash" in params:
-                qr_hash = params["hash"][0]
-        except:
-            pass
-
-        if not doc_id:
-            try:
-                payload = json.loads(qr_str)
-                doc_id = payload.get("doc_id", "").strip()
-                qr_hash = payload.get("hash", "").strip()
-            except:
-                pass
+    if require_qr or not (doc_id_hint and doc_id_hint.strip()):
+        # Decode cost scales with pixel count; the QR stamp stays well
+        # above the detector's minimum module size at this resolution
+        qr_img = pil_img
+        w, h = pil_img.size
+        scale = QR_DECODE_MAX_EDGE / max(w, h)
+        if scale < 1.0:
+            qr_img = pil_img.convert("L").resize(
+                (max(1, int(w * scale)), max(1, int(h * scale))), Image.BILINEAR)
+        qr_str = extract_qr_from_pil(qr_img)
+        if qr_img is not pil_img:
+            qr_img.close()
+        if qr_str:
+            # Could be a URL or JSON
+            doc_id, qr_hash = parse_qr_payload(qr_str)
 
     # ── Step 2: Fallback to URL hints passed from web ──
     if not doc_id and doc_id_hint:
@@ -852,24 +1379,32 @@ def verify_document_full(pil_img: Image.Image, is_physical: bool = False,
         qr_hash = hash_hint.strip()
 
     if not doc_id:
-        return {
+        failure = {
             "valid": False,
             "verdict": "NO QR FOUND",
             "message": "Could not detect a QR code in this document. Make sure the document has a DocShield QR stamp.",
             "document": None,
             "confidence": 0.0
         }
+        # ── Step 2b: No QR on a photo — suggest the nearest registry pHash ──
+        # Only a suggestion: without a QR or bound hash nothing ties the
+        # photo to that record, so the verdict stays NO QR FOUND
+        if is_physical:
+            photo = preprocess_photo(pil_img)
+            candidate = find_by_perceptual_hash(perceptual_hash(photo))
+            if photo is not pil_img:
+                photo.close()
+            if candidate:
+                failure["suggested_doc_id"] = candidate["doc_id"]
+                failure["message"] += (f" It looks like registry document '{candidate['doc_id']}'"
+                                       " — scan its QR stamp or enter that ID to verify it.")
+        return None, failure
 
     # ── Step 3: Registry lookup ──
-    records = load_registry()
-    match = None
-    for rec in records:
-        if rec.get("document", {}).get("doc_id") == doc_id:
-            match = rec
-            break
-
-    if not match:
-        return {
+    doc = lookup_doc_by_id(doc_id)
+
+    if not doc:
+        return None, {
             "valid": False,
             "verdict": "NOT IN REGISTRY",
             "message": f"Document ID '{doc_id}' was not found in the registry. This document may be fraudulent or was issued elsewhere.",
@@ -877,8 +1412,6 @@ def verify_document_full(pil_img: Image.Image, is_physical: bool = False,
             "confidence": 0.0
         }
 
-    doc = match["document"]
-
     # ── Step 4: Hash verification ──
     if qr_hash:
         expected_hash = make_bound_hash(
@@ -886,8 +1419,8 @@ def verify_document_full(pil_img: Image.Image, is_physical: bool = False,
             doc["doc_type"], doc["issue_date"],
             doc.get("file_hash", "")
         )
-        if qr_hash != expected_hash:
-            return {
+        if not qr_hash_matches(qr_hash, expected_hash):
+            return doc, {
                 "valid": False,
                 "verdict": "TAMPERED",
                 "message": "QR code hash does not match registry. This document has been tampered with or forged.",
@@ -895,27 +1428,49 @@ def verify_document_full(pil_img: Image.Image, is_physical: bool = False,
                 "confidence": 0.0
             }
 
-    # ── Step 5: Visual/perceptual content verification ──
-    if is_physical:
-        quality_ok, quality_msg = check_photo_quality(pil_img)
-        if not quality_ok:
-            return {
-                "valid": False,
-                "verdict": "POOR PHOTO QUALITY",
-                "message": f"Photo quality too low for reliable verification. {quality_msg}. Please retake with better lighting.",
-                "document": doc,
-                "confidence": 0.0
-            }
-        pil_img = preprocess_photo(pil_img)
+    return doc, None
+
+
+def verify_digital(pil_img: Image.Image, doc_id_hint: str = None,
+                   hash_hint: str = None, require_qr: bool = False):
+    """Digital mode — registry checks, then an exact visual hash."""
+    doc, failure = _resolve_document(pil_img, False, doc_id_hint, hash_hint, require_qr)
+    if failure:
+        return failure
+
+    vhash = visual_fingerprint(pil_img)
+    if vhash == doc.get("visual_hash", ""):
+        return {"valid": True, "verdict": "AUTHENTIC",
+                "message": "Digital document is genuine. Pixel-perfect match confirmed.",
+                "document": doc, "confidence": 1.0}
+    else:
+        return {"valid": False, "verdict": "MODIFIED",
+                "message": "Document has been digitally altered since issuance.",
+                "document": doc, "confidence": 0.0}
+
 
+def verify_physical(pil_img: Image.Image, doc_id_hint: str = None,
+                    hash_hint: str = None, require_qr: bool = False):
+    """Photo mode — registry checks, quality gate, then pHash + text features."""
+    doc, failure = _resolve_document(pil_img, True, doc_id_hint, hash_hint, require_qr)
+    if failure:
+        return failure
+
+    quality_ok, quality_msg = check_photo_quality(pil_img)
+    if not quality_ok:
+        return {
+            "valid": False,
+            "verdict": "POOR PHOTO QUALITY",
+            "message": f"Photo quality too low for reliable verification. {quality_msg}. Please retake with better lighting.",
+            "document": doc,
+            "confidence": 0.0
+        }
+    # The enhanced copy is full resolution; free it as soon as the
+    # verdict is known rather than when the request finishes
+    photo = preprocess_photo(pil_img)
+    try:
         if doc.get("perceptual_hash"):
-            phash = perceptual_hash(pil_img)
-            phash_score = compare_perceptual_hash(doc["perceptual_hash"], phash)
-            text_score = 0.5
-            if doc.get("text_features"):
-                text_feat = extract_text_features(pil_img)
-                text_score = compare_text_features(doc["text_features"], text_feat)
-            confidence = phash_score * 0.7 + text_score * 0.3
+            confidence = physical_confidence(photo, doc)
             if confidence >= 0.65:
                 return {"valid": True, "verdict": "AUTHENTIC",
                         "message": "Document is genuine. Content matches original on file.",
@@ -925,7 +1480,7 @@ def verify_document_full(pil_img: Image.Image, is_physical: bool = False,
                         "message": f"Document content does not match original ({confidence:.0%} similarity). Possible substitution or forgery.",
                         "document": doc, "confidence": confidence}
         else:
-            vhash = visual_fingerprint(pil_img)
+            vhash = visual_fingerprint(photo)
             if vhash == doc.get("visual_hash", ""):
                 return {"valid": True, "verdict": "AUTHENTIC",
                         "message": "Document is genuine.", "document": doc, "confidence": 1.0}
@@ -933,50 +1488,141 @@ def verify_document_full(pil_img: Image.Image, is_physical: bool = False,
                 return {"valid": False, "verdict": "CONTENT MISMATCH",
                         "message": "Document content does not match original.",
                         "document": doc, "confidence": 0.0}
-    else:
-        # Digital mode — exact visual hash
-        vhash = visual_fingerprint(pil_img)
-        if vhash == doc.get("visual_hash", ""):
-            return {"valid": True, "verdict": "AUTHENTIC",
-                    "message": "Digital document is genuine. Pixel-perfect match confirmed.",
-                    "document": doc, "confidence": 1.0}
-        else:
-            return {"valid": False, "verdict": "MODIFIED",
-                    "message": "Document has been digitally altered since issuance.",
-                    "document": doc, "confidence": 0.0}
+    finally:
+        if photo is not pil_img:
+            photo.close()
+
+
+def verify_document_full(pil_img: Image.Image, is_physical: bool = False,
+                          doc_id_hint: str = None, hash_hint: str = None,
+                          require_qr: bool = False):
+    """
+    Full document verification.
+    Tries:
+      1. QR code embedded in the document image
+      2. URL params (doc_id_hint + hash_hint) passed from web UI
+    When doc_id_hint is given the QR decode is skipped (the caller has
+    already read it) unless require_qr is set.
+    Returns dict: {valid, verdict, message, document, confidence}
+    """
+    verify = verify_physical if is_physical else verify_digital
+    return verify(pil_img, doc_id_hint, hash_hint, require_qr)
+
+
+_LOOKUP_COLS = ("doc_id", "holder_name", "doc_type", "issue_date", "expiry_date",
+                "additional", "file_hash", "visual_hash", "perceptual_hash",
+                "text_features", "hash", "verify_url", "timestamp")
+
+_LOOKUP_SQL = """
+    SELECT doc_id, holder_name, doc_type, issue_date, expiry_date,
+           additional, file_hash, visual_hash, perceptual_hash,
+           text_features, bound_hash, verify_url, issued_at::text
+    FROM documents WHERE doc_id = $1 LIMIT 1
+"""
+
+
+_doc_cache = {}                    # doc_id -> (record, fetched_at); insertion-ordered
+_doc_cache_lock = threading.Lock()
+_DOC_CACHE_TTL = 60                # seconds
+_DOC_CACHE_MAX = 4096
+_reply_cache = {}                  # request key -> (JSON body, cached_at) for the verify endpoints
+_registry_version = 0              # bumped on every save; keys the rendered admin page
+_admin_html = None                 # (registry version, HTML, rendered_at)
 
 
 def lookup_doc_by_id(doc_id: str) -> dict | None:
     """Fetch a single document record from Supabase by doc_id (fast path)."""
-    conn = _get_conn()
-    if conn:
-        try:
-            with _db_lock:
-                with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                    cur.execute("""
-                        SELECT doc_id, holder_name, doc_type, issue_date, expiry_date,
-                               additional, file_hash, visual_hash, perceptual_hash,
-                               text_features, bound_hash AS hash, verify_url,
-                               issued_at::text AS timestamp
-                        FROM documents WHERE doc_id = %s LIMIT 1;
-                    """, (doc_id,))
+    now = time.time()
+    with _doc_cache_lock:
+        hit = _doc_cache.get(doc_id)
+    if hit and now - hit[1] < _DOC_CACHE_TTL:
+        return hit[0]
+    with _get_conn() as conn:
+        if conn:
+            try:
+                with conn.cursor() as cur:
+                    _execute_prepared(cur, "lookup_doc", _LOOKUP_SQL, (doc_id,))
                     row = cur.fetchone()
-            if row:
-                d = dict(row)
-                if d.get("text_features") and isinstance(d["text_features"], str):
-                    try:
-                        d["text_features"] = json.loads(d["text_features"])
-                    except Exception:
-                        d["text_features"] = None
+                conn.rollback()  # end the read-only transaction before returning the conn
+                if not row:
+                    return None
+                d = dict(zip(_LOOKUP_COLS, row))  # JSONB text_features arrives as a dict
+                with _doc_cache_lock:
+                    _doc_cache.pop(doc_id, None)
+                    if len(_doc_cache) >= _DOC_CACHE_MAX:
+                        del _doc_cache[next(iter(_doc_cache))]  # oldest entry
+                    _doc_cache[doc_id] = (d, now)
                 return d
-        except Exception as e:
-            print(f"  [DB] lookup_doc_by_id failed ({e}), falling back to full load.")
+            except Exception as e:
+                print(f"  [DB] lookup_doc_by_id failed ({e}), falling back to local JSON.")
+
+    # Fallback: local JSON registry
+    rec = get_registry_index().get(doc_id)
+    return rec["document"] if rec else None
+
+
+_phash_table = None                # (doc_ids, uint64 pHash array, built_at)
+_PHASH_TABLE_TTL = 60              # seconds
 
-    # Fallback: scan full registry
-    for rec in load_registry():
-        if rec.get("document", {}).get("doc_id") == doc_id:
-            return rec["document"]
-    return None
+
+def _load_phash_table():
+    """doc_ids and their perceptual hashes as a contiguous uint64 array."""
+    global _phash_table
+    if _phash_table and time.time() - _phash_table[2] < _PHASH_TABLE_TTL:
+        return _phash_table[0], _phash_table[1]
+    pairs = None
+    with _get_conn() as conn:
+        if conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT doc_id, perceptual_hash FROM documents
+                        WHERE perceptual_hash LIKE 'p2:%';
+                    """)
+                    pairs = cur.fetchall()
+                conn.rollback()
+            except Exception as e:
+                print(f"  [DB] pHash table load failed ({e}), using local JSON.")
+    if pairs is None:
+        pairs = [(doc_id, rec["document"].get("perceptual_hash"))
+                 for doc_id, rec in get_registry_index().items()
+                 if (rec["document"].get("perceptual_hash") or "").startswith(PHASH_PREFIX)]
+    # Legacy average hashes are not comparable with a fresh DCT pHash
+    doc_ids, hashes = [], []
+    for doc_id, phash in pairs:
+        try:
+            hashes.append(_phash_value(phash))
+            doc_ids.append(doc_id)
+        except ValueError:
+            continue
+    arr = np.array(hashes, dtype=np.uint64)
+    _phash_table = (doc_ids, arr, time.time())
+    return doc_ids, arr
+
+
+def _registry_changed(doc_ids):
+    """Drop cached lookups for re-issued doc_ids and the pHash table, so the
+    next verification sees the saved documents."""
+    global _phash_table, _registry_version
+    _phash_table = None
+    with _doc_cache_lock:
+        for doc_id in doc_ids:
+            _doc_cache.pop(doc_id, None)
+        _reply_cache.clear()
+        _registry_version += 1
+
+
+def find_by_perceptual_hash(phash: str, max_distance: int = PHASH_MATCH_MAX_BITS) -> dict | None:
+    """Nearest registry document by pHash Hamming distance, or None if no
+    document is within max_distance bits."""
+    doc_ids, arr = _load_phash_table()
+    if not doc_ids:
+        return None
+    distances = np.bitwise_count(arr ^ np.uint64(_phash_value(phash)))
+    best = int(np.argmin(distances))
+    if distances[best] > max_distance:
+        return None
+    return lookup_doc_by_id(doc_ids[best])
 
 
 def verify_by_id_only(doc_id: str, qr_hash: str = None):
@@ -998,7 +1644,7 @@ def verify_by_id_only(doc_id: str, qr_hash: str = None):
             doc["doc_type"], doc["issue_date"],
             doc.get("file_hash", "")
         )
-        if qr_hash != expected:
+        if not qr_hash_matches(qr_hash, expected):
             return {
                 "valid": False,
                 "verdict": "TAMPERED",
@@ -1019,9 +1665,74 @@ def verify_by_id_only(doc_id: str, qr_hash: str = None):
 # FLASK WEB SERVER
 # =============================================================================
 
+class _OrjsonProvider(DefaultJSONProvider):
+    """jsonify() through orjson. Anything it cannot encode, and any call with
+    per-call json options (sort_keys=, indent=, ...), goes to the stdlib,
+    which honours them all."""
+
+    sort_keys = False  # replies keep insertion order, also on the stdlib path
+
+    def _orjson_option(self, extra: int = 0) -> int:
+        option = orjson.OPT_SERIALIZE_NUMPY | extra
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, option=self._orjson_option()).decode()
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Same argument rules as DefaultJSONProvider.response; orjson's bytes
+        # go into the body as they are, with no str round-trip
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)  # indented output
+        obj = args[0] if len(args) == 1 else (args or kwargs or None)
+        try:
+            body = orjson.dumps(obj, option=self._orjson_option(orjson.OPT_APPEND_NEWLINE))
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
 flask_app = Flask(__name__)
+flask_app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+if ORJSON_AVAILABLE:
+    flask_app.json = _OrjsonProvider(flask_app)
 CORS(flask_app)
 
+_COMPRESS_MIN_SIZE = 512           # bytes; smaller bodies are not worth a gzip frame
+_COMPRESS_TYPES = ("application/json", "text/html")
+
+
+@flask_app.after_request
+def _compress_response(resp):
+    """Gzip dynamic JSON/HTML replies (registry listing, admin page) for
+    clients that accept it. Prebuilt assets set their own Content-Encoding."""
+    if (resp.direct_passthrough or resp.status_code < 200 or resp.status_code >= 300
+            or "Content-Encoding" in resp.headers
+            or resp.mimetype not in _COMPRESS_TYPES
+            or "gzip" not in request.accept_encodings):
+        return resp
+    body = resp.get_data()
+    if len(body) < _COMPRESS_MIN_SIZE:
+        return resp
+    resp.set_data(gzip.compress(body, 6))
+    resp.headers["Content-Encoding"] = "gzip"
+    resp.vary.add("Accept-Encoding")
+    return resp
+
 # ── Inline HTML (the full frontend) ──
 HTML_PAGE = r"""<!DOCTYPE html>
 <html lang="en">
@@ -1030,7 +1741,12 @@ HTML_PAGE = r"""<!DOCTYPE html>
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
 <title>DocShield — Document Verification</title>
 <link rel="preconnect" href="https://fonts.googleapis.com">
-<link href="https://fonts.googleapis.com/css2?family=Space+Mono:wght@400;700&family=Syne:wght@400;600;800&display=swap" rel="stylesheet">
+<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+<link rel="preconnect" href="https://cdnjs.cloudflare.com">
+<link rel="dns-prefetch" href="https://cdnjs.cloudflare.com">
+<link rel="preload" as="script" href="https://cdnjs.cloudflare.com/ajax/libs/jsqr/1.4.0/jsQR.min.js">
+<link href="https://fonts.googleapis.com/css2?family=Space+Mono:wght@400;700&family=Syne:wght@400;600;800&display=swap" rel="stylesheet" media="print" onload="this.media='all'">
+<noscript><link href="https://fonts.googleapis.com/css2?family=Space+Mono:wght@400;700&family=Syne:wght@400;600;800&display=swap" rel="stylesheet"></noscript>
 <style>
   :root {
     --ink: #0a0a0f;
@@ -1260,7 +1976,7 @@ HTML_PAGE = r"""<!DOCTYPE html>
         <div class="drop-sub">PDF · PNG · JPG · BMP · TIFF</div>
       </div>
       <div class="preview-wrap" id="preview-wrap">
-        <img id="preview-img" src="" alt="Document preview">
+        <img id="preview-img" alt="Document preview" decoding="async">
       </div>
       <button class="btn btn-primary" id="verify-btn" onclick="verifyUpload()" disabled>
         <svg width="17" height="17" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"/><polyline points="22 4 12 14.01 9 11.01"/></svg>
@@ -1320,12 +2036,15 @@ HTML_PAGE = r"""<!DOCTYPE html>
 <div class="toast" id="toast"></div>
 
 <script src="https://cdnjs.cloudflare.com/ajax/libs/jsqr/1.4.0/jsQR.min.js"></script>
-<script src="https://cdnjs.cloudflare.com/ajax/libs/qrcodejs/1.0.0/qrcode.min.js"></script>
 <script>
 const BASE = window.location.origin;
-let scanStream = null, scanInterval = null;
-let uploadedFile = null, physicalMode = false;
-let qrTimer = null;
+let scanStream = null, scanInterval = null, scanDeviceId = null;
+let scanSurfaces = {}, scanTick = 0, scanWorker = null, scanBusy = false;
+const SCAN_PERIOD = 250, SCAN_EDGE = 480, SCAN_FULL_RES_EVERY = 4, SCAN_OTSU_EVERY = 4;
+const SNAP_EDGE = 1024, SNAP_QUALITY = 0.80;
+let uploadedFile = null, previewUrl = null, physicalMode = false;
+let qrTimer = null, lastQRId = null, qrLib = null, qrAbort = null;
+const qrCache = new Map();  // doc_id -> {data, img} for documents already rendered
 
 // ── Init ──
 window.addEventListener('DOMContentLoaded', () => {
@@ -1346,6 +2065,18 @@ function switchTab(t) {
   document.querySelectorAll('.panel').forEach(el => el.classList.remove('active'));
   document.getElementById('panel-'+t).classList.add('active');
   if (t !== 'scan') stopScanner();
+  if (t === 'generate') loadQRLib();
+}
+function loadQRLib() {
+  // qrcodejs is only needed by the Generate tab, so it is fetched on first use
+  if (!qrLib) qrLib=new Promise((resolve, reject) => {
+    const el=document.createElement('script');
+    el.src='https://cdnjs.cloudflare.com/ajax/libs/qrcodejs/1.0.0/qrcode.min.js';
+    el.onload=resolve;
+    el.onerror=()=>{ qrLib=null; reject(new Error('Could not load the QR library')); };
+    document.head.appendChild(el);
+  });
+  return qrLib;
 }
 
 // ── CAMERA SCANNER ──
@@ -1371,12 +2102,14 @@ async function startScanner() {
 
   statusEl.textContent = 'Requesting camera permission…';
 
-  // Try rear (environment) camera first, fall back to any camera
+  // Reuse the camera that worked last time; otherwise try rear (environment)
+  // camera first, fall back to any camera
   const constraints = [
     { video: { facingMode: { ideal: 'environment' }, width: { ideal: 1280 }, height: { ideal: 720 } } },
     { video: { facingMode: 'environment' } },
     { video: true }
   ];
+  if (scanDeviceId) constraints.unshift({ video: { deviceId: { exact: scanDeviceId }, width: { ideal: 1280 }, height: { ideal: 720 } } });
 
   let stream = null;
   let lastErr = null;
@@ -1386,6 +2119,9 @@ async function startScanner() {
       break;
     } catch(e) {
       lastErr = e;
+      // Looser constraints cannot fix a denied permission or a missing camera,
+      // and each extra attempt re-initialises the camera pipeline
+      if (['NotAllowedError','PermissionDeniedError','NotFoundError','SecurityError'].includes(e.name)) break;
     }
   }
 
@@ -1404,43 +2140,138 @@ async function startScanner() {
   }
 
   scanStream = stream;
+  const track = stream.getVideoTracks()[0];
+  scanDeviceId = (track && track.getSettings && track.getSettings().deviceId) || null;
   const v = document.getElementById('qr-video');
   v.srcObject = stream;
   try { await v.play(); } catch(e) {}
   document.getElementById('start-btn').style.display = 'none';
   document.getElementById('stop-btn').style.display = 'flex';
   statusEl.textContent = 'Scanning… point at a QR code';
-  scanInterval = setInterval(() => scanFrame(v), 250);
+  if ('requestVideoFrameCallback' in HTMLVideoElement.prototype) {
+    // Only look at frames the camera actually produced (no re-decoding a frame
+    // that already failed), still at most one every SCAN_PERIOD ms
+    let last = 0;
+    const step = (now) => {
+      if (scanStream !== stream) return;  // stopped or restarted
+      if (now - last >= SCAN_PERIOD) { last = now; scanFrame(v); }
+      v.requestVideoFrameCallback(step);
+    };
+    v.requestVideoFrameCallback(step);
+  } else {
+    scanInterval = setInterval(() => scanFrame(v), SCAN_PERIOD);
+  }
 }
 function stopScanner() {
   if (scanStream) { scanStream.getTracks().forEach(t=>t.stop()); scanStream=null; }
   if (scanInterval) { clearInterval(scanInterval); scanInterval=null; }
+  scanBusy=false;
   document.getElementById('start-btn').style.display='flex';
   document.getElementById('stop-btn').style.display='none';
   document.getElementById('scan-status').textContent='Camera stopped';
 }
+function scanSurface(name, w, h) {
+  // Canvases live for the whole session; willReadFrequently keeps them CPU-backed for getImageData
+  let s=scanSurfaces[name];
+  if (!s) {
+    const c=document.createElement('canvas');
+    s=scanSurfaces[name]={c, ctx:c.getContext('2d',{willReadFrequently:true,alpha:false})};
+  }
+  if (s.c.width!==w || s.c.height!==h) { s.c.width=w; s.c.height=h; }
+  return s;
+}
+function otsuBinarize(px) {
+  // In-place black/white threshold at the level maximising between-class variance
+  const n=px.length>>2, hist=new Uint32Array(256), lum=new Uint8Array(n);
+  for (let i=0,j=0;j<n;i+=4,j++) { const y=(px[i]+2*px[i+1]+px[i+2])>>2; lum[j]=y; hist[y]++; }
+  let sum=0; for (let t=0;t<256;t++) sum+=t*hist[t];
+  let sumB=0, wB=0, best=0, thr=127;
+  for (let t=0;t<256;t++) {
+    wB+=hist[t]; if (!wB) continue;
+    const wF=n-wB; if (!wF) break;
+    sumB+=t*hist[t];
+    const d=sumB/wB-(sum-sumB)/wF, between=wB*wF*d*d;
+    if (between>best) { best=between; thr=t; }
+  }
+  for (let i=0,j=0;j<n;i+=4,j++) { const b=lum[j]>thr?255:0; px[i]=px[i+1]=px[i+2]=b; }
+}
+function decodeFrame(px, w, h, otsu) {
+  // Cheap pass first; light-on-dark codes need the inverted pass, and a
+  // global Otsu threshold now and then rescues glare/low-contrast captures
+  let code=jsQR(px,w,h,{inversionAttempts:'dontInvert'});
+  if (!code) code=jsQR(px,w,h,{inversionAttempts:'onlyInvert'});
+  if (!code && otsu) {
+    otsuBinarize(px);
+    code=jsQR(px,w,h,{inversionAttempts:'attemptBoth'});
+  }
+  return code ? code.data : null;
+}
+function getScanWorker() {
+  // Decoding runs in a Worker built from the two functions above, so jsQR never
+  // blocks the UI thread; if the Worker cannot start we decode inline instead
+  if (scanWorker===null) {
+    try {
+      const lib=document.querySelector('script[src*="jsQR"]').src;
+      const src=`importScripts(${JSON.stringify(lib)});\n${otsuBinarize}\n${decodeFrame}\n`+
+        'onmessage=e=>{const m=e.data;postMessage(decodeFrame(new Uint8ClampedArray(m.buf),m.w,m.h,m.otsu));};';
+      scanWorker=new Worker(URL.createObjectURL(new Blob([src],{type:'text/javascript'})));
+      scanWorker.onmessage=e=>{ scanBusy=false; if (e.data) onQRFound(e.data); };
+      scanWorker.onerror=()=>{ scanWorker=false; scanBusy=false; };
+    } catch(e) { scanWorker=false; }
+  }
+  return scanWorker || null;
+}
 function scanFrame(v) {
-  if (!v.videoWidth) return;
-  const c=document.createElement('canvas'); c.width=v.videoWidth; c.height=v.videoHeight;
-  const ctx=c.getContext('2d'); ctx.drawImage(v,0,0);
+  if (!v.videoWidth || scanBusy) return;
+  const vw=v.videoWidth, vh=v.videoHeight;
+  // jsQR cost scales with pixel count: decode a small copy, and every
+  // SCAN_FULL_RES_EVERY-th tick retry at sensor resolution for distant codes
+  const full=(++scanTick % SCAN_FULL_RES_EVERY)===0;
+  const k=full ? 1 : Math.min(1, SCAN_EDGE/Math.max(vw,vh));
+  const {c, ctx}=scanSurface(full?'full':'small', Math.round(vw*k), Math.round(vh*k));
+  ctx.drawImage(v,0,0,c.width,c.height);
   const id=ctx.getImageData(0,0,c.width,c.height);
-  const code=jsQR(id.data,id.width,id.height,{inversionAttempts:'dontInvert'});
-  if (code) {
-    stopScanner();
-    document.getElementById('scan-status').textContent='✓ QR detected! Analyzing full document…';
-    // Capture full document frame for pixel matching (vs forged copies with copied QR)
-    c.toBlob(blob=>processQRWithDocument(code.data, blob, 'scan-result'), 'image/jpeg', 0.92);
+  const otsu=!full && scanTick % SCAN_OTSU_EVERY === 2;
+  const worker=getScanWorker();
+  if (worker) {
+    // The pixel buffer is transferred, not copied; skip ticks until the reply
+    scanBusy=true;
+    worker.postMessage({buf:id.data.buffer, w:id.width, h:id.height, otsu}, [id.data.buffer]);
+    return;
   }
+  const text=decodeFrame(id.data, id.width, id.height, otsu);
+  if (text) onQRFound(text);
 }
-function processQR(data, rid) {
+function onQRFound(text) {
+  if (!scanStream) return;  // scanner was stopped while the frame was decoding
+  const v=document.getElementById('qr-video'), vw=v.videoWidth, vh=v.videoHeight;
+  // Capture the document frame for pixel matching (vs forged copies with copied QR).
+  // pHash and text features are scale-invariant, so a ≤SNAP_EDGE JPEG encodes
+  // and uploads several times faster than the raw sensor frame
+  const ks=Math.min(1, SNAP_EDGE/Math.max(vw,vh));
+  const snap=scanSurface('snap', Math.round(vw*ks), Math.round(vh*ks));
+  snap.ctx.drawImage(v,0,0,snap.c.width,snap.c.height);
+  stopScanner();
+  document.getElementById('scan-status').textContent='✓ QR detected! Analyzing full document…';
+  snap.c.toBlob(blob=>processQRWithDocument(text, blob, 'scan-result'), 'image/jpeg', SNAP_QUALITY);
+}
+function parseQR(data) {
+  // Same dispatch as parse_qr_payload on the server: look at the first
+  // characters instead of letting new URL() / JSON.parse throw on bare IDs
   let docId=data, hash='';
-  try {
-    const u=new URL(data); const p=new URLSearchParams(u.search);
-    if(p.get('verify')) docId=p.get('verify');
-    if(p.get('hash')) hash=p.get('hash');
-  } catch(e) {
-    try { const j=JSON.parse(data); docId=j.doc_id||data; hash=j.hash||''; } catch(e2){}
+  if (/^(https?|docshield):/i.test(data)) {
+    try {
+      const p=new URL(data).searchParams;
+      if(p.get('verify')) docId=p.get('verify');
+      if(p.get('hash')) hash=p.get('hash');
+    } catch(e) {}
+  } else if (data.charCodeAt(0)===123) {  // '{'
+    try { const j=JSON.parse(data); docId=j.doc_id||data; hash=j.hash||''; } catch(e) {}
   }
+  return {docId, hash};
+}
+function processQR(data, rid) {
+  const {docId, hash}=parseQR(data);
   showLoading(rid, 'Verifying…');
   fetch(`${BASE}/api/verify-id`, {
     method:'POST', headers:{'Content-Type':'application/json'},
@@ -1448,14 +2279,7 @@ function processQR(data, rid) {
   }).then(r=>r.json()).then(d=>renderResult(rid,d)).catch(e=>showResult(rid,'fake','API Error',e.message,0));
 }
 async function processQRWithDocument(qrData, docBlob, rid) {
-  let docId=qrData, hash='';
-  try {
-    const u=new URL(qrData); const p=new URLSearchParams(u.search);
-    if(p.get('verify')) docId=p.get('verify');
-    if(p.get('hash')) hash=p.get('hash');
-  } catch(e) {
-    try { const j=JSON.parse(qrData); docId=j.doc_id||qrData; hash=j.hash||''; } catch(e2){}
-  }
+  const {docId, hash}=parseQR(qrData);
   showLoading(rid, 'Verifying with pixel matching…');
   const fd=new FormData();
   fd.append('file', docBlob, 'document.jpg');
@@ -1487,16 +2311,20 @@ function togglePhysical() {
   document.getElementById('phys-toggle').classList.toggle('on',physicalMode);
   document.getElementById('phys-label').textContent=physicalMode?'Physical document mode (photo)':'Digital document mode';
 }
+function setPreview(f) {
+  const img=document.getElementById('preview-img'), wrap=document.getElementById('preview-wrap');
+  // Each object URL pins the whole file in memory until revoked
+  if (previewUrl) { URL.revokeObjectURL(previewUrl); previewUrl=null; }
+  if (!f) { img.removeAttribute('src'); wrap.classList.remove('show'); return; }
+  const url=previewUrl=URL.createObjectURL(f);
+  img.src=url;
+  // Decode off the main thread before revealing, so a multi-MB photo does not jank
+  img.decode().catch(()=>{}).then(()=>{ if (previewUrl===url) wrap.classList.add('show'); });
+}
 function handleFile(e) {
   const f=e.target.files[0]; if(!f) return;
   uploadedFile=f;
-  if (f.type.startsWith('image/')) {
-    const url=URL.createObjectURL(f);
-    document.getElementById('preview-img').src=url;
-    document.getElementById('preview-wrap').classList.add('show');
-  } else {
-    document.getElementById('preview-wrap').classList.remove('show');
-  }
+  setPreview(f.type.startsWith('image/') ? f : null);
   document.getElementById('verify-btn').disabled=false;
   document.getElementById('clear-btn').style.display='flex';
   document.getElementById('upload-result').classList.remove('show');
@@ -1527,7 +2355,7 @@ async function verifyUpload() {
 function clearUpload() {
   uploadedFile=null;
   document.getElementById('file-input').value='';
-  document.getElementById('preview-wrap').classList.remove('show');
+  setPreview(null);
   document.getElementById('verify-btn').disabled=true;
   document.getElementById('clear-btn').style.display='none';
   document.getElementById('upload-result').classList.remove('show');
@@ -1536,24 +2364,44 @@ function clearUpload() {
 }
 
 // ── GENERATE QR ──
-function scheduleQR() { clearTimeout(qrTimer); qrTimer=setTimeout(_generateQR, 500); }
+function scheduleQR() {
+  clearTimeout(qrTimer);
+  if (qrAbort) { qrAbort.abort(); qrAbort=null; }  // a newer keystroke supersedes any lookup in flight
+  qrTimer=setTimeout(_generateQR, 250);
+}
 async function _generateQR() {
   const id=document.getElementById('gen-id').value.trim();
   const ph=document.getElementById('qr-placeholder');
   const ow=document.getElementById('qr-output-wrap');
   const gr=document.getElementById('gen-result');
-  if (!id) { ph.style.display='block'; ow.style.display='none'; gr.classList.remove('show'); return; }
-
-  // Lookup in registry via API
-  const res=await fetch(`${BASE}/api/doc-info?id=${encodeURIComponent(id)}`);
-  const data=await res.json();
+  if (!id) { lastQRId=null; ph.style.display='block'; ow.style.display='none'; gr.classList.remove('show'); return; }
+  if (id===lastQRId) return;  // already on screen
+
+  // Lookup in registry via API (found documents are remembered with their rendered QR)
+  const hit=qrCache.get(id);
+  let data=hit && hit.data;
+  if (!data) {
+    const ctl=qrAbort=new AbortController();
+    try {
+      const res=await fetch(`${BASE}/api/doc-info?id=${encodeURIComponent(id)}`,{signal:ctl.signal});
+      data=await res.json();
+    } catch(e) {
+      if (e.name==='AbortError') return;
+      throw e;
+    } finally {
+      if (qrAbort===ctl) qrAbort=null;
+    }
+    if (id!==document.getElementById('gen-id').value.trim()) return;  // superseded while in flight
+  }
 
   if (!data.found) {
+    lastQRId=null;
     ph.style.display='none'; ow.style.display='none';
     showResult('gen-result','fake','NOT IN REGISTRY',`Document ID "${id}" not found. Issue it first using the Python GUI.`,0);
     return;
   }
 
+  lastQRId=id;
   gr.classList.remove('show');
   ph.style.display='none';
   ow.style.display='block';
@@ -1569,16 +2417,15 @@ async function _generateQR() {
   const canvas=document.getElementById('qr-canvas');
   const ctx=canvas.getContext('2d');
   ctx.clearRect(0,0,200,200);
+  if (hit && hit.img) { ctx.drawImage(hit.img,0,0,200,200); return; }
   const tmp=document.createElement('div');
   try {
+    await loadQRLib();
     new QRCode(tmp,{text:verifyUrl,width:200,height:200,colorDark:'#0a0a0f',colorLight:'#ffffff',correctLevel:QRCode.CorrectLevel.H});
-    setTimeout(()=>{
-      const img=tmp.querySelector('img')||tmp.querySelector('canvas');
-      if(img){
-        if(img.tagName==='CANVAS'){ctx.drawImage(img,0,0,200,200);}
-        else{const i=new Image();i.onload=()=>ctx.drawImage(i,0,0,200,200);i.src=img.src;}
-      }
-    },120);
+    // qrcodejs paints its canvas synchronously (only the <img> copy is deferred),
+    // so it can be drawn straight away instead of after a timed wait
+    const qr=tmp.querySelector('canvas');
+    if(qr){ctx.drawImage(qr,0,0,200,200);qrCache.set(id,{data,img:qr});}
   } catch(e){}
 }
 function downloadQR() {
@@ -1621,9 +2468,11 @@ function showResult(id,type,verdict,detail,conf) {
       <div class="conf-bg"><div class="conf-fill ${conf<0.5?'low':''}" style="width:0%"></div></div>
       <span class="conf-pct">${pct}%</span>
     </div>`;
-  requestAnimationFrame(()=>setTimeout(()=>{
-    const f=b.querySelector('.conf-fill'); if(f) f.style.width=pct+'%';
-  },50));
+  // Style the bar at 0% once, then set the target so the width transition runs.
+  // (Setting it inside a single rAF would be too early: styles are only
+  // recalculated after rAF callbacks, so the bar would jump without animating.)
+  const f=b.querySelector('.conf-fill');
+  if(f){ getComputedStyle(f).width; f.style.width=pct+'%'; }
 }
 function copyUrl() { navigator.clipboard.writeText(window.location.origin+'/').then(()=>showToast('URL copied!')); }
 function showToast(msg) {
@@ -1634,10 +2483,115 @@ function showToast(msg) {
 </body>
 </html>"""
 
+def _minify_page(html: str) -> str:
+    """Collapse the <style> block and drop indentation and blank lines.
+    Line breaks are kept, so the inline script's semicolon insertion is
+    unchanged."""
+    def _css(m):
+        css = re.sub(r"/\*.*?\*/", "", m.group(2), flags=re.S)
+        css = re.sub(r"\s+", " ", css)
+        css = re.sub(r"\s*([{};,])\s*", r"\1", css)
+        return m.group(1) + css.strip() + m.group(3)
+    html = re.sub(r"(<style[^>]*>)(.*?)(</style>)", _css, html, flags=re.S)
+    return "\n".join(line.strip() for line in html.splitlines() if line.strip())
+
+
+# Front-end libraries. A copy dropped into static/vendor/ is served from this
+# origin (no extra DNS/TLS handshake, immutable caching); otherwise the CDN is used.
+VENDOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "vendor")
+_VENDOR_SCRIPTS = {
+    "jsQR.min.js": "https://cdnjs.cloudflare.com/ajax/libs/jsqr/1.4.0/jsQR.min.js",
+    "qrcode.min.js": "https://cdnjs.cloudflare.com/ajax/libs/qrcodejs/1.0.0/qrcode.min.js",
+}
+
+
+def _load_vendor_assets() -> dict:
+    """name -> (raw bytes, gzipped bytes, etag) for each library present locally."""
+    assets = {}
+    for name in _VENDOR_SCRIPTS:
+        try:
+            with open(os.path.join(VENDOR_DIR, name), "rb") as f:
+                raw = f.read()
+        except OSError:
+            continue
+        assets[name] = (raw, gzip.compress(raw, 9), hashlib.sha256(raw).hexdigest()[:16])
+    return assets
+
+
+_vendor_assets = _load_vendor_assets()
+
+
+def _page_with_vendor_scripts(html: str) -> str:
+    for name, (_, _, etag) in _vendor_assets.items():
+        html = html.replace(_VENDOR_SCRIPTS[name], f"/vendor/{name}?v={etag}")
+    if not any(url in html for url in _VENDOR_SCRIPTS.values()):
+        html = html.replace('<link rel="preconnect" href="https://cdnjs.cloudflare.com">\n', "")
+        html = html.replace('<link rel="dns-prefetch" href="https://cdnjs.cloudflare.com">\n', "")
+    return html
+
+
+# The page is constant: minify, encode, compress and tag it once at import
+_HTML_BYTES = _minify_page(_page_with_vendor_scripts(HTML_PAGE)).encode("utf-8")
+_HTML_GZ = gzip.compress(_HTML_BYTES, 9)
+_HTML_ETAG = hashlib.sha256(_HTML_BYTES).hexdigest()[:32]
+_HTML_MTIME = datetime.fromtimestamp(int(os.path.getmtime(__file__)), timezone.utc)
+
 
 @flask_app.route("/")
 def index():
-    return Response(HTML_PAGE, mimetype="text/html")
+    # Each encoding is a different byte sequence, so each gets its own strong ETag
+    if "gzip" in request.accept_encodings:
+        resp = Response(_HTML_GZ, mimetype="text/html")
+        resp.headers["Content-Encoding"] = "gzip"
+        resp.set_etag(f"{_HTML_ETAG}-gz")
+    else:
+        resp = Response(_HTML_BYTES, mimetype="text/html")
+        resp.set_etag(_HTML_ETAG)
+    resp.headers["Vary"] = "Accept-Encoding"
+    # Revalidate every load (a 304 is cheap) so a redeploy is picked up at once
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.last_modified = _HTML_MTIME
+    return resp.make_conditional(request)
+
+
+@flask_app.route("/vendor/<name>")
+def vendor_script(name):
+    asset = _vendor_assets.get(name)
+    if asset is None:
+        return Response("Not found", status=404)
+    raw, gz, etag = asset
+    if "gzip" in request.accept_encodings:
+        resp = Response(gz, mimetype="text/javascript")
+        resp.headers["Content-Encoding"] = "gzip"
+        etag = f"{etag}-gz"
+    else:
+        resp = Response(raw, mimetype="text/javascript")
+    resp.headers["Vary"] = "Accept-Encoding"
+    # URLs carry ?v=<content hash>, so a changed file gets a new URL
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    resp.set_etag(etag)
+    return resp.make_conditional(request)
+
+
+def _cached_reply(key):
+    with _doc_cache_lock:
+        hit = _reply_cache.get(key)
+    if hit and time.time() - hit[1] < _DOC_CACHE_TTL:
+        return Response(hit[0], mimetype="application/json")
+    return None
+
+
+def _remember_reply(key, result: dict):
+    """Encode a verify result and keep the reply for reuse. Results without a
+    document (unknown ID, errors) are not kept — a missing ID may be issued
+    any moment."""
+    resp = jsonify(result)
+    if result.get("document"):
+        with _doc_cache_lock:
+            if len(_reply_cache) >= _DOC_CACHE_MAX:
+                del _reply_cache[next(iter(_reply_cache))]
+            _reply_cache[key] = (resp.get_data(), time.time())
+    return resp
 
 
 @flask_app.route("/api/verify-id", methods=["POST"])
@@ -1650,8 +2604,12 @@ def api_verify_id():
     if not doc_id:
         return jsonify({"valid": False, "verdict": "NO ID", "message": "No document ID provided.", "document": None, "confidence": 0.0})
 
-    result = verify_by_id_only(doc_id, qr_hash or None)
-    return jsonify(result)
+    # Re-scans of the same QR (several verifiers, retries) reuse the encoded reply
+    key = ("id", doc_id, qr_hash)
+    cached = _cached_reply(key)
+    if cached:
+        return cached
+    return _remember_reply(key, verify_by_id_only(doc_id, qr_hash or None))
 
 
 @flask_app.route("/api/verify-upload", methods=["POST"])
@@ -1661,12 +2619,16 @@ def api_verify_upload():
         return jsonify({"valid": False, "verdict": "NO FILE", "message": "No file uploaded.", "document": None, "confidence": 0.0})
 
     f = request.files["file"]
+    if not upload_supported(f):
+        return jsonify({"valid": False, "verdict": "UNSUPPORTED FILE", "message": "Upload a PDF, PNG, JPG, BMP or TIFF file.", "document": None, "confidence": 0.0}), 415
     is_physical = request.form.get("physical", "0") == "1"
 
     try:
-        file_bytes = f.read()
-        pil_img = pil_from_bytes(file_bytes, f.filename)
-        result = verify_document_full(pil_img, is_physical=is_physical)
+        pil_img = pil_from_upload(f)
+        try:
+            result = verify_document_full(pil_img, is_physical=is_physical)
+        finally:
+            pil_img.close()
         return jsonify(result)
     except Exception as e:
         return jsonify({"valid": False, "verdict": "ERROR", "message": str(e), "document": None, "confidence": 0.0})
@@ -1679,6 +2641,8 @@ def api_verify_with_image():
         return jsonify({"valid": False, "verdict": "NO IMAGE", "message": "No image captured.", "document": None, "confidence": 0.0})
 
     f = request.files["file"]
+    if not upload_supported(f):
+        return jsonify({"valid": False, "verdict": "UNSUPPORTED FILE", "message": "Upload a PDF, PNG, JPG, BMP or TIFF file.", "document": None, "confidence": 0.0}), 415
     doc_id = request.form.get("doc_id", "").strip()
     qr_hash = request.form.get("hash", "").strip()
     from_camera = request.form.get("from_camera", "0") == "1"
@@ -1687,10 +2651,8 @@ def api_verify_with_image():
         return jsonify({"valid": False, "verdict": "NO ID", "message": "Document ID not extracted.", "document": None, "confidence": 0.0})
 
     try:
-        file_bytes = f.read()
-        pil_img = pil_from_bytes(file_bytes, f.filename)
-        
-        # Lookup document in registry
+        # Registry misses and bad QR hashes are answered from the (cached) lookup
+        # alone, before the upload is hashed or decoded
         doc = lookup_doc_by_id(doc_id)
         if not doc:
             return jsonify({"valid": False, "verdict": "NOT IN REGISTRY", 
@@ -1704,51 +2666,59 @@ def api_verify_with_image():
                 doc["doc_type"], doc["issue_date"],
                 doc.get("file_hash", "")
             )
-            if qr_hash != expected_hash:
+            if not qr_hash_matches(qr_hash, expected_hash):
                 return jsonify({"valid": False, "verdict": "TAMPERED QR",
                                "message": "QR code does not match registry. This document has been tampered with or has a forged QR.",
                                "document": doc, "confidence": 0.0})
 
+        # A byte-identical re-upload (retry, shared photo) gets the earlier verdict
+        # without another decode and fingerprint pass
+        key = ("image", doc_id, qr_hash, upload_sha256(f))
+        cached = _cached_reply(key)
+        if cached:
+            return cached
+        return _remember_reply(key, _verify_with_image(f, doc))
+    except Exception as e:
+        return jsonify({"valid": False, "verdict": "ERROR", "message": str(e), "document": None, "confidence": 0.0})
+
+
+def _verify_with_image(f, doc: dict) -> dict:
+    """Pixel/perceptual match of an upload against a registry document whose
+    ID and QR hash have already been checked."""
+    try:
         # ≈ Pixel matching for camera captures ≈
-        # Test if the captured image matches the stored visual hash
-        if doc.get("visual_hash") or doc.get("perceptual_hash"):
-            captured_vhash = visual_fingerprint(pil_img)
-            stored_vhash = doc.get("visual_hash", "")
-            
-            if stored_vhash and captured_vhash == stored_vhash:
+        # The upload is only decoded once a stored hash needs comparing
+        stored_vhash = doc.get("visual_hash") or ""
+        if stored_vhash or doc.get("perceptual_hash"):
+            pil_img = pil_from_upload(f)
+
+            # Test if the captured image matches the stored visual hash
+            if stored_vhash and visual_fingerprint(pil_img) == stored_vhash:
                 # Perfect pixel match — very high confidence for digital documents
-                return jsonify({"valid": True, "verdict": "AUTHENTIC",
-                               "message": "QR verified + pixels match original. Document is AUTHENTIC.",
-                               "document": doc, "confidence": 1.0})
+                return {"valid": True, "verdict": "AUTHENTIC",
+                        "message": "QR verified + pixels match original. Document is AUTHENTIC.",
+                        "document": doc, "confidence": 1.0}
             
             # For photos (physical documents), use perceptual hash + content matching
             if doc.get("perceptual_hash"):
-                phash = perceptual_hash(pil_img)
-                phash_score = compare_perceptual_hash(doc["perceptual_hash"], phash)
-                
-                text_score = 0.5
-                if doc.get("text_features"):
-                    text_feat = extract_text_features(pil_img)
-                    text_score = compare_text_features(doc["text_features"], text_feat)
-                
-                confidence = phash_score * 0.7 + text_score * 0.3
+                confidence = physical_confidence(pil_img, doc)
                 
                 if confidence >= 0.65:
-                    return jsonify({"valid": True, "verdict": "AUTHENTIC",
-                                   "message": f"QR + perceptual match. Document is GENUINE ({confidence:.0%} match).",
-                                   "document": doc, "confidence": confidence})
+                    return {"valid": True, "verdict": "AUTHENTIC",
+                            "message": f"QR + perceptual match. Document is GENUINE ({confidence:.0%} match).",
+                            "document": doc, "confidence": confidence}
                 else:
-                    return jsonify({"valid": False, "verdict": "CONTENT MISMATCH",
-                                   "message": f"QR is valid but content doesn't match ({confidence:.0%} similarity). Possible FORGERY or substitution.",
-                                   "document": doc, "confidence": confidence})
+                    return {"valid": False, "verdict": "CONTENT MISMATCH",
+                            "message": f"QR is valid but content doesn't match ({confidence:.0%} similarity). Possible FORGERY or substitution.",
+                            "document": doc, "confidence": confidence}
         
         # Fallback — QR verified but no visual hash stored
-        return jsonify({"valid": True, "verdict": "AUTHENTIC",
-                       "message": "QR code verified successfully. Document matches registry.",
-                       "document": doc, "confidence": 0.95})
+        return {"valid": True, "verdict": "AUTHENTIC",
+                "message": "QR code verified successfully. Document matches registry.",
+                "document": doc, "confidence": 0.95}
 
     except Exception as e:
-        return jsonify({"valid": False, "verdict": "ERROR", "message": str(e), "document": None, "confidence": 0.0})
+        return {"valid": False, "verdict": "ERROR", "message": str(e), "document": None, "confidence": 0.0}
 
 
 @flask_app.route("/api/doc-info")
@@ -1771,43 +2741,78 @@ def api_doc_info():
     return jsonify({"found": False})
 
 
+def _registry_entry(rec: dict) -> dict:
+    doc = rec.get("document", {})
+    return {
+        "doc_id": doc.get("doc_id"),
+        "holder": doc.get("holder_name"),
+        "type": doc.get("doc_type"),
+        "issued": rec.get("issued_date"),
+    }
+
+
 @flask_app.route("/api/registry")
 def api_registry():
-    """Return full registry summary (for debugging)."""
-    records = load_registry()
-    summary = []
-    for rec in records:
-        doc = rec.get("document", {})
-        summary.append({
-            "doc_id": doc.get("doc_id"),
-            "holder": doc.get("holder_name"),
-            "type": doc.get("doc_type"),
-            "issued": rec.get("issued_date"),
-        })
-    db_backend = "supabase_postgres" if (_get_conn() is not None) else "local_json_fallback"
+    """Return full registry summary (for debugging).
+    ?format=ndjson streams one record per line instead of a single document."""
+    if request.args.get("format") == "ndjson":
+        def stream():
+            for rec in iter_registry_summary():
+                yield flask_app.json.dumps(_registry_entry(rec)) + "\n"
+        return Response(stream(), mimetype="application/x-ndjson")
+
+    summary = [_registry_entry(rec) for rec in load_registry_summary()]
+    db_backend = "supabase_postgres" if (_get_pool() is not None) else "local_json_fallback"
     return jsonify({"count": len(summary), "records": summary, "backend": db_backend})
 
 
-@flask_app.route("/admin")
-def admin_dashboard():
-    """Admin dashboard — full registry access and verification controls."""
-    records = load_registry()
-    db_status = "✅ PostgreSQL" if _get_conn() else "📄 JSON Fallback"
-    
-    rows_html = ""
-    for rec in records:
-        doc = rec.get("document", {})
-        rows_html += f"""
+_ADMIN_ROW_TMPL = """
         <tr>
-            <td>{doc.get('doc_id', 'N/A')}</td>
-            <td>{doc.get('holder_name', 'N/A')}</td>
-            <td>{doc.get('doc_type', 'N/A')}</td>
-            <td>{doc.get('issue_date', 'N/A')}</td>
-            <td>{rec.get('issued_date', 'N/A')[:10]}</td>
-            <td><button class="btn-sm" onclick="copyToClipboard('{doc.get('doc_id')}')">📋 Copy ID</button></td>
+            <td>{doc_id}</td>
+            <td>{holder}</td>
+            <td>{doc_type}</td>
+            <td>{issue_date}</td>
+            <td>{recorded}</td>
+            <td><button class="btn-sm" data-id="{doc_id}" onclick="copyToClipboard(this.dataset.id)">📋 Copy ID</button></td>
         </tr>
         """
+
+
+def _admin_row(rec: dict) -> str:
+    doc = rec.get("document", {})
+    return _ADMIN_ROW_TMPL.format(
+        doc_id=html.escape(str(doc.get("doc_id", "N/A"))),
+        holder=html.escape(str(doc.get("holder_name", "N/A"))),
+        doc_type=html.escape(str(doc.get("doc_type", "N/A"))),
+        issue_date=html.escape(str(doc.get("issue_date", "N/A"))),
+        recorded=html.escape(str(rec.get("issued_date", "N/A"))[:10]),
+    )
+
+
+@flask_app.route("/admin")
+def admin_dashboard():
+    """Admin dashboard — full registry access and verification controls."""
+    global _admin_html
+    with _doc_cache_lock:
+        version, cached = _registry_version, _admin_html
+    # Saves in this process bump the version; the TTL picks up saves made by
+    # other workers, same as the document cache.
+    if cached and cached[0] == version and time.time() - cached[2] < _DOC_CACHE_TTL:
+        return cached[1]
+    page = _render_admin()
+    with _doc_cache_lock:
+        if _registry_version == version:
+            _admin_html = (version, page, time.time())
+    return page
+
+
+def _render_admin() -> str:
+    records = load_registry_summary()
+    db_status = "✅ PostgreSQL" if _get_pool() else "📄 JSON Fallback"
     
+    # Registry fields are user-supplied at issue time, so escape them
+    rows_html = "".join(_admin_row(rec) for rec in records)
+
     return f"""
     <!DOCTYPE html>
     <html>
@@ -1840,7 +2845,7 @@ def admin_dashboard():
             <p>Full registry access and verification management</p>
         </div>
         <div class="container">
-            <div class="status {'postgres' if _get_conn() else 'json'}">📂 Database: {db_status} | Total Documents: {len(records)}</div>
+            <div class="status {'postgres' if _get_pool() else 'json'}">📂 Database: {db_status} | Total Documents: {len(records)}</div>
             <table>
                 <thead>
                     <tr>
@@ -1878,14 +2883,32 @@ def run_flask():
             import ssl
             ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
             ctx.load_cert_chain(CERT_FILE, KEY_FILE)
+            # waitress has no TLS, so HTTPS stays on Werkzeug's threaded server
             flask_app.run(host="0.0.0.0", port=WEB_PORT, debug=False,
-                          use_reloader=False, ssl_context=ctx)
+                          use_reloader=False, threaded=True, ssl_context=ctx)
             return
         except Exception as e:
             print(f"  [SSL] HTTPS failed ({e}), falling back to HTTP.")
 
     # Fallback: plain HTTP (camera won't work on Android for non-localhost)
-    flask_app.run(host="0.0.0.0", port=WEB_PORT, debug=False, use_reloader=False)
+    if WAITRESS_AVAILABLE:
+        waitress_serve(flask_app, host="0.0.0.0", port=WEB_PORT,
+                       threads=max(4, os.cpu_count() or 1))
+        return
+    flask_app.run(host="0.0.0.0", port=WEB_PORT, debug=False,
+                  use_reloader=False, threaded=True)
+
+
+def _put_latest(q: queue.Queue, item):
+    """Hand item to a single-slot queue, replacing anything not yet taken."""
+    try:
+        q.get_nowait()
+    except queue.Empty:
+        pass
+    try:
+        q.put_nowait(item)
+    except queue.Full:
+        pass
 
 
 # =============================================================================
@@ -1911,12 +2934,16 @@ class ResultPanel(tk.Frame):
         self.details.pack(pady=10, padx=15)
         self.reset()
 
+    def _paint(self, bg, title, verdict, fg, confidence="", details=""):
+        """Apply one result state to every label in a single pass."""
+        self.configure(bg=bg)
+        self.title.configure(bg=bg, text=title)
+        self.verdict.configure(bg=bg, text=verdict, fg=fg)
+        self.confidence.configure(bg=bg, text=confidence)
+        self.details.configure(bg=bg, text=details, fg=fg)
+
     def show_legit(self, doc: dict, confidence: float = 1.0):
         if not TKINTER_AVAILABLE: return
-        self.configure(bg=self.OK)
-        self.title.configure(bg=self.OK, text="✅  AUTHENTIC DOCUMENT  ✅")
-        self.verdict.configure(bg=self.OK, text="✓  LEGITIMATE  ✓", fg="darkgreen")
-        self.confidence.configure(bg=self.OK, text=f"Confidence: {confidence:.1%}" if confidence < 1.0 else "")
         lines = [
             f"Document ID: {doc.get('doc_id','N/A')}",
             f"Holder: {doc.get('holder_name','N/A')}",
@@ -1925,52 +2952,18 @@ class ResultPanel(tk.Frame):
         ]
         if doc.get("expiry_date"):
             lines.append(f"Expires: {doc['expiry_date']}")
-        self.details.configure(bg=self.OK, text="\n".join(lines), fg="darkgreen")
+        self._paint(self.OK, "✅  AUTHENTIC DOCUMENT  ✅", "✓  LEGITIMATE  ✓", "darkgreen",
+                    f"Confidence: {confidence:.1%}" if confidence < 1.0 else "",
+                    "\n".join(lines))
 
     def show_fake(self, reason: str, confidence: float = 0.0):
         if not TKINTER_AVAILABLE: return
-        self.configure(bg=self.FAIL)
-        self.title.configure(bg=self.FAIL, text="❌  FORGED / INVALID  ❌")
-        self.verdict.configure(bg=self.FAIL, text="✗  FAKE  ✗", fg="darkred")
-        self.confidence.configure(bg=self.FAIL, text=f"Confidence: {confidence:.1%}" if confidence > 0 else "")
-        self.details.configure(bg=self.FAIL, text=reason, fg="darkred")
+        self._paint(self.FAIL, "❌  FORGED / INVALID  ❌", "✗  FAKE  ✗", "darkred",
+                    f"Confidence: {confidence:.1%}" if confidence > 0 else "", reason)
 
     def reset(self):
         if not TKINTER_AVAILABLE: return
-        self.configure(bg=self.IDLE)
-        self.title.configure(bg=self.IDLE, text="VERIFICATION RESULT")
-        self.verdict.configure(bg=self.IDLE, text="Waiting for verification…", fg="black")
-        self.confidence.configure(bg=self.IDLE, text="")
-        self.details.configure(bg=self.IDLE, text="")
-
-    def show_legit(self, doc: dict, confidence: float = 1.0):
-        self.configure(bg=self.OK)
-        self.title.configure(bg=self.OK, text="✅  AUTHENTIC DOCUMENT  ✅")
-        self.verdict.configure(bg=self.OK, text="✓  LEGITIMATE  ✓", fg="darkgreen")
-        self.confidence.configure(bg=self.OK, text=f"Confidence: {confidence:.1%}" if confidence < 1.0 else "")
-        lines = [
-            f"Document ID: {doc.get('doc_id','N/A')}",
-            f"Holder: {doc.get('holder_name','N/A')}",
-            f"Type: {doc.get('doc_type','N/A')}",
-            f"Issued: {doc.get('issue_date','N/A')}",
-        ]
-        if doc.get("expiry_date"):
-            lines.append(f"Expires: {doc['expiry_date']}")
-        self.details.configure(bg=self.OK, text="\n".join(lines), fg="darkgreen")
-
-    def show_fake(self, reason: str, confidence: float = 0.0):
-        self.configure(bg=self.FAIL)
-        self.title.configure(bg=self.FAIL, text="❌  FORGED / INVALID  ❌")
-        self.verdict.configure(bg=self.FAIL, text="✗  FAKE  ✗", fg="darkred")
-        self.confidence.configure(bg=self.FAIL, text=f"Confidence: {confidence:.1%}" if confidence > 0 else "")
-        self.details.configure(bg=self.FAIL, text=reason, fg="darkred")
-
-    def reset(self):
-        self.configure(bg=self.IDLE)
-        self.title.configure(bg=self.IDLE, text="VERIFICATION RESULT")
-        self.verdict.configure(bg=self.IDLE, text="Waiting for verification…", fg="black")
-        self.confidence.configure(bg=self.IDLE, text="")
-        self.details.configure(bg=self.IDLE, text="")
+        self._paint(self.IDLE, "VERIFICATION RESULT", "Waiting for verification…", "black")
 
 
 # =============================================================================
@@ -2101,9 +3094,10 @@ class IssueTab(tk.Frame):
                 embed_qr_into_image(self._src_path, qr, out_path)
 
             secured = file_to_pil(out_path)
-            visual_hash = visual_fingerprint(secured)
-            phash = perceptual_hash(secured)
-            text_feat = extract_text_features(secured)
+            fingerprints = compute_fingerprints(secured)
+            visual_hash = fingerprints["visual_hash"]
+            phash = fingerprints["perceptual_hash"]
+            text_feat = fingerprints["text_features"]
 
             doc = {
                 "doc_id": doc_id, "holder_name": holder, "doc_type": doc_type,
@@ -2128,7 +3122,7 @@ class IssueTab(tk.Frame):
                 f"QR encodes URL:\n{verify_url}\n\n"
                 f"Phone cameras will auto-open the web verification page!")
             try:
-                img = file_to_pil(message, dpi=100)
+                img = file_to_pil(message, dpi=100, max_size=(500, 200))
                 img.thumbnail((500, 200))
                 imgtk = ImageTk.PhotoImage(img)
                 self.preview.config(image=imgtk)
@@ -2152,6 +3146,20 @@ class CameraTab(tk.Frame):
         self.captured_frame = None
         self.captured_hash = None
         self.physical_mode = tk.BooleanVar(value=True)
+        self._feed_tick = 0
+        self._feed_job = None      # pending after() id of the next preview tick
+        self.visible = False       # set by App when the tab is shown (it opens on Issue)
+        self._warm = None          # (cam_id, VideoCapture) opened ahead of ▶ Start
+        self._warm_thread = None
+        self._feed_photo = None    # PhotoImage reused while the preview size stays put
+        # QR outlines for the preview are searched on a worker thread a few
+        # times a second; every frame in between redraws the last result
+        self._locate_jobs = queue.Queue(maxsize=1)
+        self._locate_at = 0.0
+        self._qr_polys = []
+        threading.Thread(target=self._locate_worker, daemon=True).start()
+        self._scan_jobs = queue.Queue(maxsize=1)
+        threading.Thread(target=self._scan_worker, daemon=True).start()
         self._build()
 
     def _build(self):
@@ -2194,76 +3202,169 @@ class CameraTab(tk.Frame):
         self.result = ResultPanel(self)
         self.result.pack(fill="x", padx=10, pady=5)
 
-    def _start(self):
+    def _selected_cam(self) -> int:
         try:
-            cam_id = int(self.cam_id.get())
+            return int(self.cam_id.get())
         except:
-            cam_id = 0
-        self.camera = cv2.VideoCapture(cam_id)
+            return 0
+
+    def _prewarm(self):
+        """Open the selected camera in the background while the tab is on screen,
+        so ▶ Start does not block on device start-up (slow on DirectShow)."""
+        if self.running or self._warm is not None or \
+                (self._warm_thread and self._warm_thread.is_alive()):
+            return
+        cam_id = self._selected_cam()
+
+        def opener():
+            cam = self._open_camera(cam_id)
+            if cam.isOpened():
+                cam.grab()
+            self._warm = (cam_id, cam)
+            if not self.visible:  # tab left while the device was opening
+                self._release_warm()
+
+        self._warm_thread = threading.Thread(target=opener, daemon=True)
+        self._warm_thread.start()
+
+    @staticmethod
+    def _open_camera(cam_id):
+        """Open a device with the stream format set before the first grab(),
+        so the driver negotiates it once instead of restarting the stream."""
+        cam = cv2.VideoCapture(cam_id)
+        if cam.isOpened():
+            # Most UVC webcams can send MJPG, which needs far less USB bandwidth than
+            # the raw YUY2 default at 720p; cameras without it ignore the request
+            cam.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+            cam.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_SIZE[0])
+            cam.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_SIZE[1])
+            # Keep a single frame queued so a grab() never returns a stale one
+            cam.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cam
+
+    def _release_warm(self):
+        warm, self._warm = self._warm, None
+        if warm:
+            warm[1].release()
+
+    def _start(self):
+        if self.running or not self.visible:
+            return
+        if self._warm_thread and self._warm_thread.is_alive():
+            # The device is still opening; check back rather than block Tk on join()
+            self.feed.config(text="Starting camera…")
+            self.after(50, self._start)
+            return
+        cam_id = self._selected_cam()
+        warm, self._warm = self._warm, None
+        if warm and warm[0] == cam_id and warm[1].isOpened():
+            self.camera = warm[1]  # already configured and streaming
+        else:
+            if warm:
+                warm[1].release()
+            self.camera = self._open_camera(cam_id)
         if not self.camera.isOpened():
             messagebox.showerror("Error", "Could not open camera")
             return
         self.running = True
         self.capture_btn.config(state="normal")
-        self._update_feed()
+        if self._feed_job is None:
+            self._update_feed()
+
+    def set_visible(self, visible: bool):
+        """Pause the preview loop while the tab is hidden, resume when shown."""
+        self.visible = visible
+        if not visible:
+            if self._feed_job is not None:
+                self.after_cancel(self._feed_job)
+                self._feed_job = None
+            self._release_warm()  # don't hold the device for a tab nobody is looking at
+        elif self.running:
+            if self._feed_job is None:
+                self._update_feed()
+        else:
+            self._prewarm()
 
     def _stop(self):
         self.running = False
+        if self._feed_job is not None:
+            self.after_cancel(self._feed_job)
+            self._feed_job = None
+        self._qr_polys = []
+        self._feed_photo = None
         if self.camera:
             self.camera.release()
         self.feed.config(image="", text="Camera stopped", bg="black")
         self.capture_btn.config(state="disabled")
         self.scan_btn.config(state="disabled")
 
+    def _latest_frame(self):
+        """Grab and decode the newest frame (capture and scan always want a fresh one)."""
+        if not self.camera.grab():
+            return False, None
+        return self.camera.retrieve()
+
     def _capture(self):
         if not self.camera or not self.running:
             return
-        ret, frame = self.camera.read()
+        ret, frame = self._latest_frame()
         if ret:
-            self.captured_frame = frame.copy()
-            self.captured_hash = hash_image_array_camera(frame)
-            if self.physical_mode.get():
-                pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                quality_ok, msg = check_photo_quality(pil)
-                self.quality_status.config(
-                    text=f"{'✅' if quality_ok else '⚠'} {msg}",
-                    fg="green" if quality_ok else "orange")
-            self.cap_status.config(text=f"✅ Page captured: {self.captured_hash[:20]}…", fg="green")
-            self.scan_btn.config(state="normal")
+            frame = frame.copy()
+            self.captured_frame = frame
+            self.captured_hash = None  # set once the background pass finishes
+            self.scan_btn.config(state="disabled")
+            self.cap_status.config(text="⏳ Processing capture…", fg="black")
+            # Hashing and the full-resolution quality check run off the Tk thread
+            threading.Thread(target=self._process_capture,
+                             args=(frame, self.physical_mode.get()), daemon=True).start()
+
+    def _process_capture(self, frame, physical):
+        frame_hash = hash_image_array_camera(frame)
+        quality = check_photo_quality_gray(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)) if physical else None
+        self.after_idle(lambda: self._capture_done(frame, frame_hash, quality))
+
+    def _capture_done(self, frame, frame_hash, quality):
+        if frame is not self.captured_frame:
+            return  # a newer capture or a reset came in meanwhile
+        self.captured_hash = frame_hash
+        if quality:
+            quality_ok, msg = quality
+            self.quality_status.config(
+                text=f"{'✅' if quality_ok else '⚠'} {msg}",
+                fg="green" if quality_ok else "orange")
+        self.cap_status.config(text=f"✅ Page captured: {frame_hash[:20]}…", fg="green")
+        self.scan_btn.config(state="normal")
 
     def _scan(self):
         if not self.camera or not self.running or self.captured_hash is None:
             return
-        ret, frame = self.camera.read()
+        ret, frame = self._latest_frame()
         if not ret:
             return
+        # Decoding and verifying run on the scan worker; a newer press
+        # replaces a scan that has not started yet
+        _put_latest(self._scan_jobs, (frame, self.captured_frame, self.physical_mode.get()))
+
+    def _scan_worker(self):
+        while True:
+            frame, captured, physical = self._scan_jobs.get()
+            try:
+                self._run_scan(frame, captured, physical)
+            except Exception as e:
+                msg = str(e)
+                self.after_idle(lambda: self.result.show_fake(msg))
+
+    def _run_scan(self, frame, captured, physical):
         qr_str = extract_qr_from_array(frame)
         if not qr_str:
-            messagebox.showwarning("No QR", "No QR code detected in frame")
+            self.after(0, lambda: messagebox.showwarning("No QR", "No QR code detected in frame"))
             return
 
         # Parse QR (may be a URL or JSON)
-        doc_id, qr_hash = None, None
-        try:
-            from urllib.parse import urlparse, parse_qs
-            parsed = urlparse(qr_str)
-            params = parse_qs(parsed.query)
-            if "verify" in params:
-                doc_id = params["verify"][0]
-            if "hash" in params:
-                qr_hash = params["hash"][0]
-        except:
-            pass
-        if not doc_id:
-            try:
-                payload = json.loads(qr_str)
-                doc_id = payload.get("doc_id", "")
-                qr_hash = payload.get("hash", "")
-            except:
-                pass
+        doc_id, qr_hash = parse_qr_payload(qr_str)
 
         if not doc_id:
-            self.result.show_fake("Could not parse QR code")
+            self.after_idle(lambda: self.result.show_fake("Could not parse QR code"))
             return
 
         result = verify_by_id_only(doc_id, qr_hash)
@@ -2271,15 +3372,15 @@ class CameraTab(tk.Frame):
         if result["valid"]:
             doc = result["document"]
             # Also verify visual content
-            pil = Image.fromarray(cv2.cvtColor(self.captured_frame, cv2.COLOR_BGR2RGB))
-            full = verify_document_full(pil, is_physical=self.physical_mode.get(),
+            pil = Image.fromarray(cv2.cvtColor(captured, cv2.COLOR_BGR2RGB))
+            full = verify_document_full(pil, is_physical=physical,
                                         doc_id_hint=doc_id, hash_hint=qr_hash)
             if full["valid"]:
-                self.result.show_legit(doc, full.get("confidence", 1.0))
+                self.after_idle(lambda: self.result.show_legit(doc, full.get("confidence", 1.0)))
             else:
-                self.result.show_fake(full["message"], full.get("confidence", 0.0))
+                self.after_idle(lambda: self.result.show_fake(full["message"], full.get("confidence", 0.0)))
         else:
-            self.result.show_fake(result["message"])
+            self.after_idle(lambda: self.result.show_fake(result["message"]))
 
     def _reset(self):
         self.captured_frame = None
@@ -2289,32 +3390,73 @@ class CameraTab(tk.Frame):
         self.scan_btn.config(state="disabled")
         self.result.reset()
 
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _preview_size(w: int, h: int):
+        """Size of a w x h frame fitted inside FEED_PREVIEW_BOX."""
+        scale = min(FEED_PREVIEW_BOX[0] / w, FEED_PREVIEW_BOX[1] / h, 1.0)
+        return max(1, int(w * scale)), max(1, int(h * scale))
+
+    def _locate_worker(self):
+        while True:
+            gray, scale = self._locate_jobs.get()
+            try:
+                # detectAndDecode() points come as (1, 4, 2); flatten to corner rows
+                # in full-frame coordinates, cast once to the int32 polylines() takes
+                self._qr_polys = [(np.asarray(qr.points, dtype=np.float32).reshape(-1, 2)
+                                   / scale).astype(np.int32)
+                                  for qr in decode(gray) if qr.points is not None]
+            except Exception:
+                self._qr_polys = []
+
     def _update_feed(self):
-        if not self.running or not self.camera:
+        self._feed_job = None
+        if not self.running or not self.camera or not self.visible:
             return
-        ret, frame = self.camera.read()
+        started = time.perf_counter()
+        # grab() on every tick keeps the stream current; the costly decode
+        # (retrieve) only runs for the frames that are actually shown
+        self._feed_tick += 1
+        if self.camera.grab() and self._feed_tick % FEED_DECODE_EVERY == 0:
+            ret, frame = self.camera.retrieve()
+        else:
+            ret, frame = False, None
         if ret:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            codes = decode(gray)
-            if codes:
-                for qr in codes:
-                    pts = qr.polygon
-                    if len(pts) > 4:
-                        pts = cv2.convexHull(np.array(list(pts), dtype=np.float32))
-                    for j in range(len(pts)):
-                        cv2.line(frame, tuple(map(int, pts[j])),
-                                 tuple(map(int, pts[(j + 1) % len(pts)])), (0, 255, 0), 2)
+            now = time.monotonic()
+            if now - self._locate_at >= FEED_LOCATE_PERIOD:
+                self._locate_at = now
+                # Locating needs far fewer pixels than decoding; _scan keeps full size
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                scale = min(1.0, FEED_LOCATE_WIDTH / gray.shape[1])
+                if scale < 1.0:
+                    gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                _put_latest(self._locate_jobs, (gray, scale))
+            if self._qr_polys:
+                # One C call for every outline instead of a cv2.line per edge
+                cv2.polylines(frame, self._qr_polys, True, (0, 255, 0), 2)
             if self.captured_hash:
                 cv2.putText(frame, "Page captured ✓", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
             mode = "PHYSICAL" if self.physical_mode.get() else "DIGITAL"
             cv2.putText(frame, f"Mode: {mode}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 1)
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(rgb)
-            img.thumbnail((600, 300))
-            imgtk = ImageTk.PhotoImage(img)
-            self.feed.config(image=imgtk)
-            self.feed.image = imgtk
-        self.after(50, self._update_feed)
+            # Shrink in OpenCV first so only preview-sized pixels are converted
+            # and handed to PIL, which wraps the array without copying it
+            size = self._preview_size(frame.shape[1], frame.shape[0])
+            # Bilinear is plenty for a live preview and cheaper than area averaging
+            small = cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR) \
+                if size != (frame.shape[1], frame.shape[0]) else frame
+            rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            img = Image.frombuffer("RGB", size, rgb, "raw", "RGB", 0, 1)
+            photo = self._feed_photo
+            if photo is not None and (photo.width(), photo.height()) == size:
+                photo.paste(img)
+            else:
+                photo = self._feed_photo = ImageTk.PhotoImage(img)
+                self.feed.config(image=photo)
+                self.feed.image = photo
+        # after() counts from now, so take this tick's own cost off the wait to
+        # hold the FEED_TICK_MS period (a slow tick just runs the next one sooner)
+        spent_ms = (time.perf_counter() - started) * 1000
+        self._feed_job = self.after(max(1, int(FEED_TICK_MS - spent_ms)), self._update_feed)
 
 
 # =============================================================================
@@ -2326,6 +3468,9 @@ class UploadTab(tk.Frame):
         super().__init__(parent)
         self._path = None
         self.physical_mode = tk.BooleanVar(value=False)
+        # One long-lived worker; a click while a check is queued replaces it
+        self._jobs = queue.Queue(maxsize=1)
+        threading.Thread(target=self._verify_worker, daemon=True).start()
         self._build()
 
     def _build(self):
@@ -2372,7 +3517,7 @@ class UploadTab(tk.Frame):
             self.result.reset()
             self.quality_label.config(text="")
             try:
-                img = file_to_pil(path, dpi=100)
+                img = file_to_pil(path, dpi=100, max_size=(500, 200))
                 img.thumbnail((500, 200))
                 imgtk = ImageTk.PhotoImage(img)
                 self.preview_lbl.config(image=imgtk)
@@ -2394,20 +3539,26 @@ class UploadTab(tk.Frame):
         self.result.reset()
         self.quality_label.config(text="Verifying…", fg="blue")
         self.update()
-        threading.Thread(target=self._verify_thread, daemon=True).start()
+        _put_latest(self._jobs, (self._path, self.physical_mode.get()))
 
-    def _verify_thread(self):
+    def _verify_worker(self):
+        while True:
+            path, physical = self._jobs.get()
+            self._verify_thread(path, physical)
+
+    def _verify_thread(self, path, physical):
         try:
-            pil = file_to_pil(self._path, dpi=150)
-            if self.physical_mode.get():
+            pil = file_to_pil(path, dpi=150)
+            if physical:
                 quality_ok, quality_msg = check_photo_quality(pil)
                 self.after(0, lambda: self.quality_label.config(
                     text=quality_msg, fg="green" if quality_ok else "orange"))
-            result = verify_document_full(pil, is_physical=self.physical_mode.get())
-            self.after(0, lambda: self._show(result))
+            result = verify_document_full(pil, is_physical=physical)
+            self.after_idle(lambda: self._show(result))
         except Exception as e:
-            self.after(0, lambda: self._show({"valid": False, "verdict": "ERROR",
-                                              "message": str(e), "document": None, "confidence": 0.0}))
+            msg = str(e)  # e is unbound once the except block ends
+            self.after_idle(lambda: self._show({"valid": False, "verdict": "ERROR",
+                                              "message": msg, "document": None, "confidence": 0.0}))
 
     def _show(self, result):
         if result["valid"]:
@@ -2457,7 +3608,7 @@ class App:
         # Registry info
         info2 = tk.Frame(self.root, bg="#E8EAF6")
         info2.pack(fill="x", padx=10, pady=3)
-        db_status = "✅ Supabase PostgreSQL connected" if _get_conn() else "⚠ Using local JSON fallback"
+        db_status = "✅ Supabase PostgreSQL connected" if _get_pool() else "⚠ Using local JSON fallback"
         tk.Label(info2, text=f"Registry: {db_status}  |  {DATABASE_URL.split('@')[1].split('?')[0]}",
                  font=("Arial", 9), bg="#E8EAF6", fg="#1A237E").pack()
 
@@ -2465,12 +3616,17 @@ class App:
         notebook = ttk.Notebook(self.root)
         notebook.pack(fill="both", expand=True, padx=10, pady=5)
         notebook.add(IssueTab(notebook), text="  📄 Issue Document  ")
-        notebook.add(CameraTab(notebook), text="  📷 Camera Verify  ")
+        self.camera_tab = CameraTab(notebook)
+        notebook.add(self.camera_tab, text="  📷 Camera Verify  ")
         notebook.add(UploadTab(notebook), text="  📂 Upload Verify  ")
+        notebook.bind("<<NotebookTabChanged>>", self._on_tab_change)
 
         self.status = tk.Label(self.root, text=f"Ready  |  Web UI: https://localhost:{WEB_PORT}  |  Admin: https://localhost:{WEB_PORT}/admin", bd=1, relief="sunken", anchor="w")
         self.status.pack(fill="x", padx=10, pady=2)
 
+    def _on_tab_change(self, event):
+        self.camera_tab.set_visible(event.widget.select() == str(self.camera_tab))
+
     def run(self):
         if not TKINTER_AVAILABLE:
             return